@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+# Micro-benchmarks for the content hot path.
+# Run with: BOT_TOKEN=0:bench python bench.py
+
+import os
+import random
+import sys
+import threading
+import timeit
+import tracemalloc
+
+os.environ.setdefault("BOT_TOKEN", "0:bench")
+
+import bot
+
+ROUNDS = 10000
+
+RAW = {category: bot.load_category(category) for category in bot.CATEGORIES}
+
+# =========================================================
+# HELPERS
+# =========================================================
+
+def concat_lookup(category):
+    # What get_sentences() did before the compiled index existed
+    data = RAW[category]["sentences"]
+    return data["base"] + data["extra"]
+
+def index_lookup(category):
+    return bot.ProfessionalEngine(0).get_sentences(category)
+
+def allocated_per_call(func, category):
+    func(category)
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for _ in range(100):
+        func(category)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - before
+
+def report(name, func, category):
+    seconds = timeit.timeit(lambda: func(category), number=ROUNDS)
+    peak = allocated_per_call(func, category)
+    print(f"{name:<16} {category:<10} {seconds / ROUNDS * 1e6:8.2f} us/call  peak {peak:8d} B")
+    return peak
+
+# =========================================================
+# BENCHMARKS
+# =========================================================
+
+def bench_content_lookup():
+    print("content lookup")
+    ok = True
+    for category in bot.CATEGORIES:
+        old = report("base+extra", concat_lookup, category)
+        new = report("compiled index", index_lookup, category)
+        # The index lookup returns a shared tuple: nothing proportional to
+        # the pool size may be allocated per request.
+        ok = ok and new < old and new < 1024
+    return ok
+
+def bench_keyboards():
+    print("reply markup")
+    built = report(
+        "build+to_json", lambda c: bot.build_regenerate_menu("sentences", c).to_json(), "gaza"
+    )
+    cached = report("cached", lambda c: bot.regenerate_menu("sentences", c), "gaza")
+    return cached < built
+
+def bench_memory_threads(threads=32, users=200, sigs=50):
+    # Every thread marks the same (uid, sig) pairs at once: check_and_mark
+    # must hand each pair to exactly one thread, and the size accounting of
+    # the shards must match what they actually hold afterwards.
+    print("memory stress")
+    barrier = threading.Barrier(threads)
+    wins = [0] * threads
+
+    def hammer(n):
+        barrier.wait()
+        for uid in range(users):
+            for sig in range(sigs):
+                if bot.Memory.check_and_mark(10**9 + uid, sig):
+                    wins[n] += 1
+
+    workers = [threading.Thread(target=hammer, args=(n,)) for n in range(threads)]
+    started = timeit.default_timer()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = timeit.default_timer() - started
+
+    ops = threads * users * sigs
+    held = sum(len(sigs) for shard in bot.Memory.SHARDS for sigs, _ in shard.users.values())
+    print(f"{threads} threads  {ops / elapsed:10.0f} ops/s  marked {sum(wins)}  held {held}")
+    return sum(wins) == users * sigs and held == bot.Memory.size()
+
+def bench_near_duplicates(entries=100000):
+    # Synthetic corpus built from the real sentences with words shuffled
+    # and dropped, so it has the vocabulary and the paraphrase density
+    # the clusterer is meant for
+    print("near-duplicate clustering")
+    words = [
+        text.split()
+        for category in bot.CATEGORIES
+        for text in RAW[category]["sentences"]["base"] + RAW[category]["sentences"]["extra"]
+    ]
+    rng = random.Random(7)
+    corpus = []
+    for _ in range(entries):
+        sentence = list(rng.choice(words))
+        rng.shuffle(sentence)
+        corpus.append(" ".join(sentence[: max(4, len(sentence) - rng.randrange(3))]))
+
+    seconds = timeit.timeit(lambda: bot.cluster_near_duplicates(corpus), number=1)
+    clusters = bot.cluster_near_duplicates(corpus[:2000])
+    print(f"{entries} sentences  {seconds:6.2f} s  ({len(clusters)} clusters in the first 2000)")
+    return seconds < 60
+
+if __name__ == "__main__":
+    results = [
+        bench_content_lookup(), bench_keyboards(), bench_memory_threads(),
+        bench_near_duplicates(),
+    ]
+    sys.exit(0 if all(results) else 1)
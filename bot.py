@@ -1,10 +1,30 @@
 # -*- coding: utf-8 -*-
 
 import os
+import json
+import re
+import math
+import html
 import random
-import hashlib
 import time
 import logging
+import heapq
+import threading
+import hashlib
+import hmac
+import zlib
+import queue
+import atexit
+import sqlite3
+import mmap
+import fcntl
+import struct
+import operator
+import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict, deque, namedtuple
 import telebot
 from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
 
@@ -16,29 +36,759 @@ TOKEN = os.getenv("BOT_TOKEN")
 logging.basicConfig(level=logging.INFO)
 bot = telebot.TeleBot(TOKEN, parse_mode="HTML")
 
+# =========================================================
+# METRICS
+# =========================================================
+
+# Minimal Prometheus text-format registry: counters and histograms are
+# updated from handler/outbox threads, gauges are read at scrape time.
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{v}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+
+    def __init__(self, name, doc, labels=()):
+        self.name, self.doc, self.labels = name, doc, tuple(labels)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = list(self.values.items())
+        for label_values, value in values:
+            yield f"{self.name}{_labels(self.labels, label_values)} {value}"
+
+
+class Histogram:
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+    def __init__(self, name, doc, labels=()):
+        self.name, self.doc, self.labels = name, doc, tuple(labels)
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * len(self.BUCKETS), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.BUCKETS):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = [(k, list(v[0]), v[1], v[2]) for k, v in self.series.items()]
+        names = self.labels + ("le",)
+        for label_values, counts, total, count in series:
+            cumulative = 0
+            for bound, n in zip(self.BUCKETS, counts):
+                cumulative += n
+                yield f"{self.name}_bucket{_labels(names, label_values + (bound,))} {cumulative}"
+            yield f"{self.name}_bucket{_labels(names, label_values + ('+Inf',))} {count}"
+            yield f"{self.name}_sum{_labels(self.labels, label_values)} {total}"
+            yield f"{self.name}_count{_labels(self.labels, label_values)} {count}"
+
+
+class Gauge:
+
+    def __init__(self, name, doc, read):
+        self.name, self.doc, self.read = name, doc, read
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} gauge"
+        value = self.read()
+        if value is not None:  # None: not available in this configuration
+            yield f"{self.name} {value}"
+
+
+class Registry:
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            try:
+                lines.extend(metric.collect())
+            except Exception:
+                logging.exception("Collecting %s failed", metric.name)
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Registry()
+HANDLER_SECONDS = METRICS.register(Histogram(
+    "bot_handler_seconds", "Time spent building the replies of one update.", ["branch"]
+))
+HANDLER_ERRORS = METRICS.register(Counter(
+    "bot_handler_errors_total", "Updates whose handler raised.", ["branch"]
+))
+ENGINE_EMPTY = METRICS.register(Counter(
+    "bot_engine_empty_total", "Generations that produced no post.", ["kind"]
+))
+TELEGRAM_SECONDS = METRICS.register(Histogram(
+    "bot_telegram_api_seconds", "Latency of outbound Bot API calls.", ["method"]
+))
+TELEGRAM_429 = METRICS.register(Counter(
+    "bot_telegram_429_total", "Bot API calls rejected with 429 Too Many Requests.", ["method"]
+))
+TELEGRAM_ERRORS = METRICS.register(Counter(
+    "bot_telegram_errors_total", "Bot API calls that failed for another reason.", ["method"]
+))
+
+def observe_handler(branch, build, update):
+    started = time.perf_counter()
+    try:
+        return build(update)
+    except Exception:
+        HANDLER_ERRORS.inc(branch)
+        raise
+    finally:
+        HANDLER_SECONDS.observe(time.perf_counter() - started, branch)
+
+
+class MetricsServer:
+
+    def __init__(self, host, port):
+        registry = METRICS
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name="metrics", daemon=True).start()
+        logging.info("Metrics on http://%s:%d/metrics", *self.httpd.server_address[:2])
+
+# 0 disables the endpoint
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
 # =========================================================
 # MEMORY SYSTEM (ANTI-REPETITION)
 # =========================================================
 
+class MemoryShard:
+    # One lock stripe of Memory. Per user, two parallel arrays (uint64
+    # signatures, uint32 timestamps) are kept oldest-first, so expiry and the
+    # per-user cap only ever trim a prefix. A heap holds one expiry deadline
+    # per user for the sweeper.
+
+    def __init__(self, ttl, per_user_cap, max_entries):
+        self.ttl = ttl
+        self.per_user_cap = per_user_cap
+        self.max_entries = max_entries
+        self.users = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.backend = None
+        self._heap = []
+        self._scheduled = {}
+
+    def _load(self, uid, now):
+        # Cache miss with a persistent backend: pull the user's fresh history.
+        # No history is cached too (as empty arrays, dropped by the sweeper
+        # after one TTL), so a new user costs one query, not one per lookup.
+        rows = self.backend.load(uid, now - self.ttl, self.per_user_cap)
+        entries = self.users[uid] = (array("Q"), array("I"))
+        for sig, stamp in rows:
+            entries[0].append(sig)
+            entries[1].append(stamp)
+        self.size += len(rows)
+        self._schedule(uid, (entries[1][0] if rows else now) + self.ttl)
+        # Empty histories weigh nothing in the budget: cap their number too
+        while len(self.users) > self.max_entries:
+            evicted, (evicted_sigs, _) = self.users.popitem(last=False)
+            self.size -= len(evicted_sigs)
+            self._scheduled.pop(evicted, None)
+        return entries
+
+    def _fresh(self, entries, sig, now):
+        sigs, stamps = entries
+        if sig not in sigs:
+            return False
+        return now - stamps[sigs.index(sig)] < self.ttl
+
+    def seen(self, uid, sig, now):
+        with self.lock:
+            entries = self.users.get(uid)
+            if entries is None and self.backend is not None:
+                entries = self._load(uid, now)
+            if entries is None:
+                return False
+            self.users.move_to_end(uid)
+            return self._fresh(entries, sig, now)
+
+    def check_and_mark(self, uid, sig, now, force=False):
+        # Atomic seen + store: True when `sig` was not fresh and is now marked
+        with self.lock:
+            entries = self.users.get(uid)
+            if entries is None and self.backend is not None:
+                entries = self._load(uid, now)
+            if entries is None:
+                entries = self.users[uid] = (array("Q"), array("I"))
+            else:
+                self.users.move_to_end(uid)
+                if not force and self._fresh(entries, sig, now):
+                    return False
+            self._mark(uid, entries, sig, now)
+            return True
+
+    def store_many(self, uid, sigs, now):
+        # One lock hold for a whole batch of marks
+        with self.lock:
+            entries = self.users.get(uid)
+            if entries is None and self.backend is not None:
+                entries = self._load(uid, now)
+            if entries is None:
+                entries = self.users[uid] = (array("Q"), array("I"))
+            else:
+                self.users.move_to_end(uid)
+            for sig in sigs:
+                self._mark(uid, entries, sig, now)
+
+    def _mark(self, uid, entries, sig, now):
+        sigs, stamps = entries
+        if sig in sigs:
+            i = sigs.index(sig)
+            del sigs[i]
+            del stamps[i]
+            self.size -= 1
+        sigs.append(sig)
+        stamps.append(now)
+        self.size += 1
+        if self.backend is not None:
+            self.backend.record(uid, sig, now)
+
+        overflow = len(sigs) - self.per_user_cap
+        if overflow > 0:
+            del sigs[:overflow]
+            del stamps[:overflow]
+            self.size -= overflow
+
+        self._schedule(uid, stamps[0] + self.ttl)
+        # Budget: evict whole users, least recently active first
+        while self.size > self.max_entries and len(self.users) > 1:
+            evicted, (evicted_sigs, _) = self.users.popitem(last=False)
+            self.size -= len(evicted_sigs)
+            self._scheduled.pop(evicted, None)
+
+    def _schedule(self, uid, deadline):
+        if uid in self._scheduled and self._scheduled[uid] <= deadline:
+            return
+        self._scheduled[uid] = deadline
+        heapq.heappush(self._heap, (deadline, uid))
+
+    def sweep(self, now):
+        # Drops expired entries, returns the next deadline (or None)
+        with self.lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, uid = heapq.heappop(self._heap)
+                if self._scheduled.get(uid) != deadline:
+                    continue  # stale heap entry, user was rescheduled or evicted
+                del self._scheduled[uid]
+                self._expire_user(uid, now)
+            return self._heap[0][0] if self._heap else None
+
+    def _expire_user(self, uid, now):
+        entries = self.users.get(uid)
+        if entries is None:
+            return
+        sigs, stamps = entries
+        expired = bisect_right(stamps, now - self.ttl)
+        if expired:
+            del sigs[:expired]
+            del stamps[:expired]
+            self.size -= expired
+        if stamps:
+            self._schedule(uid, stamps[0] + self.ttl)
+        else:
+            del self.users[uid]
+
+
 class Memory:
-    DATA = {}
     TTL = 3600 * 6
+    PER_USER_CAP = int(os.getenv("MEMORY_PER_USER_CAP", "500"))
+    MAX_ENTRIES = int(os.getenv("MEMORY_MAX_ENTRIES", "200000"))
+    SWEEP_INTERVAL = 60
+
+    # Users are spread over lock stripes, so concurrent callbacks for
+    # different users almost never wait on each other. The global budget
+    # is split evenly between the shards.
+    SHARD_COUNT = int(os.getenv("MEMORY_SHARDS", "64"))
+    SHARDS = []
+
+    # A store shared between processes replaces the shards altogether
+    STORE = None
+
+    _sweeper = None
+    _sweeper_lock = threading.Lock()
 
     @classmethod
     def now(cls):
         return int(time.time())
 
+    @classmethod
+    def shard(cls, uid):
+        if cls.STORE is not None:
+            return cls.STORE
+        return cls.SHARDS[hash(uid) % len(cls.SHARDS)]
+
     @classmethod
     def seen(cls, uid, sig):
-        cls.DATA.setdefault(uid, {})
-        if sig in cls.DATA[uid]:
-            return cls.now() - cls.DATA[uid][sig] < cls.TTL
-        return False
+        return cls.shard(uid).seen(uid, sig, cls.now())
+
+    @classmethod
+    def check_and_mark(cls, uid, sig):
+        cls.start_sweeper()
+        return cls.shard(uid).check_and_mark(uid, sig, cls.now())
 
     @classmethod
     def store(cls, uid, sig):
-        cls.DATA.setdefault(uid, {})
-        cls.DATA[uid][sig] = cls.now()
+        cls.start_sweeper()
+        cls.shard(uid).check_and_mark(uid, sig, cls.now(), force=True)
+
+    @classmethod
+    def store_many(cls, uid, sigs):
+        cls.start_sweeper()
+        cls.shard(uid).store_many(uid, sigs, cls.now())
+
+    @classmethod
+    def use_backend(cls, backend):
+        # The shards stay the read cache; the backend only sees cache misses
+        # and the (batched) stream of marks
+        for shard in cls.SHARDS:
+            shard.backend = backend
+        backend.start()
+
+    @classmethod
+    def use_store(cls, store):
+        cls.STORE = store
+
+    @classmethod
+    def size(cls):
+        if cls.STORE is not None:
+            return cls.STORE.size()
+        return sum(shard.size for shard in cls.SHARDS)
+
+    @classmethod
+    def users(cls):
+        # A shared store keeps no per-user index to count
+        if cls.STORE is not None:
+            return None
+        return sum(len(shard.users) for shard in cls.SHARDS)
+
+    # -----------------------------------------------------
+    # Sweeper
+    # -----------------------------------------------------
+
+    @classmethod
+    def sweep(cls):
+        now = cls.now()
+        deadlines = [shard.sweep(now) for shard in cls.SHARDS]
+        upcoming = [d for d in deadlines if d is not None]
+        return min(upcoming) - now if upcoming else cls.SWEEP_INTERVAL
+
+    @classmethod
+    def _sweep_loop(cls):
+        while True:
+            delay = cls.sweep()
+            time.sleep(min(max(delay, 1), cls.SWEEP_INTERVAL))
+
+    @classmethod
+    def start_sweeper(cls):
+        if cls._sweeper is not None:
+            return
+        with cls._sweeper_lock:
+            if cls._sweeper is None:
+                cls._sweeper = threading.Thread(
+                    target=cls._sweep_loop, name="memory-sweeper", daemon=True
+                )
+                cls._sweeper.start()
+
+Memory.SHARDS = [
+    MemoryShard(Memory.TTL, Memory.PER_USER_CAP, max(1, Memory.MAX_ENTRIES // Memory.SHARD_COUNT))
+    for _ in range(Memory.SHARD_COUNT)
+]
+
+METRICS.register(Gauge("bot_memory_entries", "Signatures held by Memory.", Memory.size))
+METRICS.register(Gauge("bot_memory_users", "Users cached by this process.", Memory.users))
+
+# =========================================================
+# MEMORY BACKENDS (PERSISTENCE)
+# =========================================================
+
+# SQLite INTEGER is signed: signatures are stored as two's complement
+def _to_signed64(value):
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+def _to_unsigned64(value):
+    return value & 0xFFFFFFFFFFFFFFFF
+
+
+class SQLiteBackend:
+    # Marks are coalesced in memory ((uid, sig) -> latest stamp) and written
+    # in one transaction per flush; expired rows are purged through the
+    # stamp index. Reads only happen on Memory cache misses.
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS memory (
+            uid INTEGER NOT NULL,
+            sig INTEGER NOT NULL,
+            stamp INTEGER NOT NULL,
+            PRIMARY KEY (uid, sig)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS memory_stamp ON memory (stamp);
+    """
+
+    def __init__(self, path, ttl, flush_interval=1.0, purge_interval=600):
+        self.path = path
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._pending = {}
+        self._inflight = {}      # the batch a flush is writing right now
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher = None
+        self._conn().executescript(self.SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, uid, since, limit):
+        # Unflushed marks are taken before the disk read: a flush that
+        # commits in between is then seen on disk instead of in neither
+        with self._pending_lock:
+            unflushed = dict(self._inflight.get(uid, {}))
+            unflushed.update(self._pending.get(uid, {}))
+        rows = self._conn().execute(
+            "SELECT sig, stamp FROM memory WHERE uid = ? AND stamp > ? "
+            "ORDER BY stamp DESC LIMIT ?",
+            (uid, since, limit),
+        ).fetchall()
+        merged = {_to_unsigned64(sig): stamp for sig, stamp in rows}
+        # Marks not flushed yet are newer than anything on disk
+        merged.update(unflushed)
+        return sorted(merged.items(), key=lambda row: row[1])[-limit:]
+
+    def record(self, uid, sig, stamp):
+        with self._pending_lock:
+            self._pending.setdefault(uid, {})[sig] = stamp
+
+    def flush(self):
+        with self._flush_lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, {}
+                self._inflight = pending
+            if not pending:
+                return
+            conn = self._conn()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO memory (uid, sig, stamp) VALUES (?, ?, ?)",
+                        (
+                            (uid, _to_signed64(sig), stamp)
+                            for uid, marks in pending.items()
+                            for sig, stamp in marks.items()
+                        ),
+                    )
+            except sqlite3.Error:
+                # Back in line for the next flush; marks made since are newer
+                with self._pending_lock:
+                    for uid, marks in pending.items():
+                        current = self._pending.setdefault(uid, {})
+                        for sig, stamp in marks.items():
+                            current.setdefault(sig, stamp)
+                raise
+            finally:
+                with self._pending_lock:
+                    self._inflight = {}
+
+    def purge(self, now):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM memory WHERE stamp <= ?", (now - self.ttl,))
+
+    def _flush_loop(self):
+        next_purge = 0
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+                now = Memory.now()
+                if now >= next_purge:
+                    self.purge(now)
+                    next_purge = now + self.purge_interval
+            except sqlite3.Error:
+                logging.exception("Memory flush to %s failed", self.path)
+
+    def start(self):
+        if self._flusher is not None:
+            return
+        self._flusher = threading.Thread(target=self._flush_loop, name="memory-flush", daemon=True)
+        self._flusher.start()
+        atexit.register(self.flush)
+
+class SharedMemoryStore:
+    # Fixed-size hash table in a memory-mapped file (normally in /dev/shm)
+    # that every worker process maps, so a user's history is the same
+    # whichever worker handles the click.
+    #
+    # The table is split into buckets of BUCKET_SLOTS records; a key only
+    # ever lives in its own bucket. A slot is free when empty or expired,
+    # and a full bucket overwrites its oldest record, so the file never grows
+    # and needs no sweeper. Each bucket is guarded by a byte-range fcntl
+    # lock (between processes) plus a striped thread lock (inside one).
+
+    MAGIC = b"PALMEM01"
+    HEADER = struct.Struct("<8sII")          # magic, buckets, ttl
+    RECORD = struct.Struct("<qQI4x")         # uid, sig, stamp (0 = empty)
+    BUCKET_SLOTS = 16
+    THREAD_STRIPES = 256
+    SIZE_SAMPLE = 1024
+
+    def __init__(self, path, slots, ttl):
+        self.path = path
+        self.ttl = ttl
+        self.buckets = max(1, slots // self.BUCKET_SLOTS)
+        self.bucket_bytes = self.RECORD.size * self.BUCKET_SLOTS
+        length = self.HEADER.size + self.buckets * self.bucket_bytes
+        self._locks = [threading.Lock() for _ in range(self.THREAD_STRIPES)]
+        self._sample_start = 0
+
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.lockf(self.fd, fcntl.LOCK_EX, self.HEADER.size, 0)
+        try:
+            if os.fstat(self.fd).st_size == 0:
+                os.ftruncate(self.fd, length)
+                os.pwrite(self.fd, self.HEADER.pack(self.MAGIC, self.buckets, ttl), 0)
+            magic, buckets, _ = self.HEADER.unpack(os.pread(self.fd, self.HEADER.size, 0))
+            if magic != self.MAGIC or buckets != self.buckets:
+                raise ValueError(f"{path} holds a different Memory table layout")
+        finally:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, self.HEADER.size, 0)
+        self.map = mmap.mmap(self.fd, length)
+
+    def _bucket(self, uid, sig):
+        mixed = ((uid * 0x9E3779B97F4A7C15) ^ sig) & 0xFFFFFFFFFFFFFFFF
+        return (mixed ^ (mixed >> 29)) % self.buckets
+
+    def _acquire(self, bucket, offset):
+        self._locks[bucket % self.THREAD_STRIPES].acquire()
+        fcntl.lockf(self.fd, fcntl.LOCK_EX, self.bucket_bytes, offset)
+
+    def _release(self, bucket, offset):
+        fcntl.lockf(self.fd, fcntl.LOCK_UN, self.bucket_bytes, offset)
+        self._locks[bucket % self.THREAD_STRIPES].release()
+
+    def _scan(self, offset, uid, sig):
+        # Returns (slot offset of the key or None, best slot offset to reuse)
+        unpack = self.RECORD.unpack_from
+        victim, victim_stamp = None, None
+        for slot in range(offset, offset + self.bucket_bytes, self.RECORD.size):
+            slot_uid, slot_sig, stamp = unpack(self.map, slot)
+            if stamp and slot_uid == uid and slot_sig == sig:
+                return slot, slot
+            if victim is None or stamp < victim_stamp:
+                victim, victim_stamp = slot, stamp
+        return None, victim
+
+    def seen(self, uid, sig, now):
+        bucket = self._bucket(uid, sig)
+        offset = self.HEADER.size + bucket * self.bucket_bytes
+        self._acquire(bucket, offset)
+        try:
+            found, _ = self._scan(offset, uid, sig)
+            if found is None:
+                return False
+            return now - self.RECORD.unpack_from(self.map, found)[2] < self.ttl
+        finally:
+            self._release(bucket, offset)
+
+    def check_and_mark(self, uid, sig, now, force=False):
+        bucket = self._bucket(uid, sig)
+        offset = self.HEADER.size + bucket * self.bucket_bytes
+        self._acquire(bucket, offset)
+        try:
+            found, slot = self._scan(offset, uid, sig)
+            if found is not None and not force:
+                if now - self.RECORD.unpack_from(self.map, found)[2] < self.ttl:
+                    return False
+            self.RECORD.pack_into(self.map, slot, uid, sig, now)
+            return True
+        finally:
+            self._release(bucket, offset)
+
+    def store_many(self, uid, sigs, now):
+        # Signatures land in different buckets, so there is no shared lock to batch under
+        for sig in sigs:
+            self.check_and_mark(uid, sig, now, force=True)
+
+    def size(self, exact=False):
+        # Live records. Scrapes get an estimate from SIZE_SAMPLE evenly spread
+        # buckets read without locks; `exact` scans the whole table.
+        now = Memory.now()
+        step = 1 if exact else max(1, self.buckets // self.SIZE_SAMPLE)
+        self._sample_start = (self._sample_start + 1) % step
+        live = 0
+        sampled = 0
+        for bucket in range(self._sample_start, self.buckets, step):
+            offset = self.HEADER.size + bucket * self.bucket_bytes
+            for _, _, stamp in self.RECORD.iter_unpack(self.map[offset:offset + self.bucket_bytes]):
+                if stamp and now - stamp < self.ttl:
+                    live += 1
+            sampled += 1
+        return live * self.buckets // max(sampled, 1)
+
+# "memory": in-process only, "sqlite": persisted to MEMORY_DB across restarts,
+# "shm": one table in MEMORY_SHM shared by every worker process on the host
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "memory")
+MEMORY_DB = os.getenv("MEMORY_DB", "memory.sqlite3")
+MEMORY_SHM = os.getenv("MEMORY_SHM", "/dev/shm/palestine-bot-memory")
+MEMORY_SHM_SLOTS = int(os.getenv("MEMORY_SHM_SLOTS", str(1 << 20)))
+
+def setup_memory_backend():
+    if MEMORY_BACKEND == "sqlite":
+        Memory.use_backend(SQLiteBackend(MEMORY_DB, Memory.TTL))
+    elif MEMORY_BACKEND == "shm":
+        Memory.use_store(SharedMemoryStore(MEMORY_SHM, MEMORY_SHM_SLOTS, Memory.TTL))
+    elif MEMORY_BACKEND != "memory":
+        raise SystemExit(f"Unknown MEMORY_BACKEND {MEMORY_BACKEND!r}")
+
+# =========================================================
+# SAMPLER (NO-RETRY PICKS)
+# =========================================================
+
+class Permutation:
+    # Lazy Fisher-Yates: only positions that were swapped are materialized,
+    # so state grows with the number of draws, not with the space size.
+    __slots__ = ("size", "cursor", "swaps")
+
+    def __init__(self, size):
+        self.size = size
+        self.cursor = 0
+        self.swaps = {}
+
+    def exhausted(self):
+        return self.cursor >= self.size
+
+    def draw(self):
+        if self.exhausted():
+            self.cursor = 0
+            self.swaps = {}
+        j = random.randrange(self.cursor, self.size)
+        picked = self.swaps.get(j, j)
+        self.swaps[j] = self.swaps.pop(self.cursor, self.cursor)
+        self.cursor += 1
+        return picked
+
+
+class Sampler:
+    # One permutation per (uid, kind, category), least recently used dropped
+    # first. State is striped by uid the same way Memory is.
+    SHARD_COUNT = Memory.SHARD_COUNT
+    MAX_STATES = int(os.getenv("SAMPLER_MAX_STATES", "50000"))
+    STATES = [OrderedDict() for _ in range(SHARD_COUNT)]
+    LOCKS = [threading.Lock() for _ in range(SHARD_COUNT)]
+
+    # Once a user has walked the whole space a new shuffled cycle starts.
+    # Picks still fresh in Memory (e.g. from the previous cycle) are skipped,
+    # but only a bounded number of times so a click never turns into a loop.
+    MAX_SKIPS = 8
+
+    @classmethod
+    def _permutation(cls, states, uid, key, size):
+        state_key = (uid,) + key
+        perm = states.get(state_key)
+        if perm is None or perm.size != size:
+            perm = states[state_key] = Permutation(size)
+        else:
+            states.move_to_end(state_key)
+        while len(states) > max(1, cls.MAX_STATES // cls.SHARD_COUNT):
+            states.popitem(last=False)
+        return perm
+
+    @classmethod
+    def draw(cls, uid, key, size, signature_of):
+        # Returns a rank and marks its signature in Memory
+        stripe = hash(uid) % cls.SHARD_COUNT
+        with cls.LOCKS[stripe]:
+            perm = cls._permutation(cls.STATES[stripe], uid, key, size)
+            rank = perm.draw()
+            skips = cls.MAX_SKIPS
+            while not Memory.check_and_mark(uid, signature_of(rank)):
+                if not skips or perm.exhausted():
+                    Memory.store(uid, signature_of(rank))
+                    break
+                rank = perm.draw()
+                skips -= 1
+            return rank
+
+    @classmethod
+    def draw_many(cls, uid, key, size, count, signature_of):
+        # `count` distinct ranks straight off the permutation, without
+        # consulting Memory per item, then marked in Memory as one batch
+        count = min(count, size)
+        stripe = hash(uid) % cls.SHARD_COUNT
+        with cls.LOCKS[stripe]:
+            perm = cls._permutation(cls.STATES[stripe], uid, key, size)
+            ranks = []
+            picked = set()
+            while len(ranks) < count:
+                # Only a reshuffle mid-batch can bring back a rank already picked
+                rank = perm.draw()
+                if rank not in picked:
+                    picked.add(rank)
+                    ranks.append(rank)
+        Memory.store_many(uid, [signature_of(rank) for rank in ranks])
+        return ranks
 
 # =========================================================
 # PALESTINE EMOJIS ONLY
@@ -46,8 +796,8 @@ class Memory:
 
 PALESTINE_EMOJIS = ["🇵🇸", "🍉", "🕊️"]
 
-def add_palestine_emoji(text):
-    return f"{text} {random.choice(PALESTINE_EMOJIS)}"
+def add_palestine_emoji(text, index):
+    return f"{text} {PALESTINE_EMOJIS[index]}"
 
 # =========================================================
 # QUESTIONS (ENGAGEMENT BOOST)
@@ -61,3511 +811,722 @@ QUESTIONS = [
     "Can history live through generations?",
 ]
 
+# Escaped once for parse_mode="HTML"
+QUESTIONS_HTML = tuple(html.escape(q, quote=False) for q in QUESTIONS)
+
+# =========================================================
+# SIGNATURES (COMPACT MEMORY KEYS)
+# =========================================================
+
+# Category ids are baked into stored signatures: only ever append here.
+CATEGORIES = ("palestine", "gaza", "maps", "suffering")
+CATEGORY_IDS = {name: i for i, name in enumerate(CATEGORIES)}
+
+# 64-bit layout, high to low:
+#   sentence: kind(1)=0 | category(7) | sentence id(32) | emoji(8) | question(16)
+#   hashtags: kind(1)=1 | category(7) | 3 x tag id(16)  | emoji(8)
+# Tag ids are packed in ascending order, so a set of hashtags has one
+# signature whatever order its tags are shown in.
+# Sentence/tag ids are derived from the text itself (see content_ids), so
+# stored signatures stay valid when content is reordered or reloaded.
+SIG_HASHTAGS = 1 << 63
+
+def sentence_signature(category_id, item, emoji, question):
+    return (category_id << 56) | (item << 24) | (emoji << 16) | question
+
+# Question field value of a near-duplicate cluster signature (item = cluster id)
+SIG_CLUSTER = 0xFFFF
+
+def cluster_signature(category_id, cluster):
+    return sentence_signature(category_id, cluster, 0, SIG_CLUSTER)
+
+def hashtag_signature(category_id, combination, emoji):
+    return SIG_HASHTAGS | (category_id << 56) | (combination << 8) | emoji
+
 # =========================================================
 # CONTENT STRUCTURE (EDIT & ADD FREELY)
 # =========================================================
 
-CONTENT = {
-    "palestine": {
-        "sentences": {
-            "base": [
-                (
-                    "Palestine is more than a place on a map.\n"
-                    "For many families, it represents identity, memory, and belonging."
-                ),
-                (
-                    "The name Palestine carries stories across generations.\n"
-                    "It connects people to roots that time has not erased."
-                ),
-            ],
-            "extra": [
-    (
-        "Palestine lives in stories told at family tables.\n"
-        "Memory keeps its presence alive across generations."
-    ),
-    (
-        "For many, Palestine is a feeling carried quietly.\n"
-        "It speaks through heritage, language, and tradition."
-    ),
-    (
-        "The word Palestine echoes with history and belonging.\n"
-        "It connects the past to the present."
-    ),
-    (
-        "Palestine represents roots that remain strong.\n"
-        "Time cannot easily erase identity."
-    ),
-    (
-        "In the hearts of many, Palestine is home.\n"
-        "Even distance does not weaken attachment."
-    ),
-    (
-        "Palestine carries memories shaped by generations.\n"
-        "Stories pass forward with resilience."
-    ),
-    (
-        "For countless families, Palestine is part of who they are.\n"
-        "Identity grows from remembered places."
-    ),
-    (
-        "The name Palestine holds meaning beyond geography.\n"
-        "It reflects culture, memory, and continuity."
-    ),
-    (
-        "Palestine is remembered in photographs and old letters.\n"
-        "History quietly survives in personal archives."
-    ),
-    (
-        "Across borders, Palestine remains present in memory.\n"
-        "Belonging does not depend on distance."
-    ),
-    (
-        "Palestine stands as a symbol of enduring identity.\n"
-        "Generations continue to carry its story."
-    ),
-    (
-        "The idea of Palestine travels with its people.\n"
-        "Memory makes every place connected."
-    ),
-    (
-        "Palestine is spoken of with warmth and reflection.\n"
-        "Its meaning grows deeper over time."
-    ),
-    (
-        "In many homes, Palestine is more than history.\n"
-        "It is part of daily remembrance."
-    ),
-    (
-        "Palestine connects families to shared origins.\n"
-        "Roots often outlast circumstances."
-    ),
-    (
-        "The memory of Palestine shapes identity.\n"
-        "It becomes part of personal narratives."
-    ),
-    (
-        "Palestine is remembered through traditions kept alive.\n"
-        "Culture carries continuity forward."
-    ),
-    (
-        "Generations grow up hearing about Palestine.\n"
-        "Stories preserve a sense of belonging."
-    ),
-    (
-        "Palestine is held gently in collective memory.\n"
-        "It remains meaningful across time."
-    ),
-    (
-        "The mention of Palestine often brings reflection.\n"
-        "It connects people to shared heritage."
-    ),
-    (
-        "Palestine lives in songs and spoken memories.\n"
-        "Art keeps identity visible."
-    ),
-    (
-        "For many, Palestine is tied to family roots.\n"
-        "Belonging can exist beyond borders."
-    ),
-    (
-        "Palestine is remembered in small everyday details.\n"
-        "Memory survives in simple traditions."
-    ),
-    (
-        "The story of Palestine is carried forward quietly.\n"
-        "Each generation adds its voice."
-    ),
-    (
-        "Palestine symbolizes connection to origin.\n"
-        "Identity grows from remembered land."
-    ),
-    (
-        "In conversations, Palestine is spoken of thoughtfully.\n"
-        "Memory gives it lasting presence."
-    ),
-    (
-        "Palestine reflects the strength of cultural continuity.\n"
-        "Roots remain part of identity."
-    ),
-    (
-        "Many see Palestine as part of their personal story.\n"
-        "History becomes lived experience."
-    ),
-    (
-        "Palestine exists in shared family narratives.\n"
-        "Memory often becomes inheritance."
-    ),
-    (
-        "The name Palestine carries emotional depth.\n"
-        "It connects generations through remembrance."
-    ),
-    (
-        "Palestine is recalled with resilience.\n"
-        "Belonging remains steady."
-    ),
-    (
-        "Across time, Palestine remains meaningful.\n"
-        "Identity continues to evolve around it."
-    ),
-    (
-        "Palestine lives in preserved memories.\n"
-        "History is kept close."
-    ),
-    (
-        "For many, Palestine defines part of their roots.\n"
-        "Attachment persists over time."
-    ),
-    (
-        "Palestine represents continuity through generations.\n"
-        "Memory shapes understanding."
-    ),
-    (
-        "The idea of Palestine bridges past and present.\n"
-        "Stories maintain connection."
-    ),
-    (
-        "Palestine is remembered with quiet strength.\n"
-        "Identity remains grounded."
-    ),
-    (
-        "In many narratives, Palestine holds significance.\n"
-        "Belonging forms part of heritage."
-    ),
-    (
-        "Palestine reflects cultural depth.\n"
-        "History remains alive in memory."
-    ),
-    (
-        "Generational stories often return to Palestine.\n"
-        "Roots remain central."
-    ),
-    (
-        "Palestine continues to inspire reflection.\n"
-        "Memory ensures continuity."
-    ),
-    (
-        "For families, Palestine is part of shared identity.\n"
-        "Heritage shapes belonging."
-    ),
-    (
-        "Palestine is remembered with dignity.\n"
-        "Identity grows from history."
-    ),
-    (
-        "The story of Palestine is ongoing.\n"
-        "Each voice adds perspective."
-    ),
-    (
-        "Palestine stands within collective memory.\n"
-        "Belonging transcends geography."
-    ),
-    (
-        "Palestine connects people to ancestral narratives.\n"
-        "Identity carries forward."
-    ),
-    (
-        "In quiet reflection, Palestine remains present.\n"
-        "Memory bridges generations."
-    ),
-    (
-        "Palestine reflects enduring heritage.\n"
-        "Roots stay meaningful."
-    ),
-    (
-        "Many hold Palestine as part of their identity.\n"
-        "Memory reinforces connection."
-    ),
-    (
-        "Palestine lives in cultural expression.\n"
-        "History finds its voice."
-    ),
-    (
-        "For some, Palestine is a guiding memory.\n"
-        "Belonging continues through time."
-    ),
-    (
-        "Palestine carries emotional significance.\n"
-        "Identity grows around it."
-    ),
-    (
-        "Generations speak of Palestine thoughtfully.\n"
-        "Stories remain powerful."
-    ),
-    (
-        "Palestine stands as a reminder of heritage.\n"
-        "Memory strengthens connection."
-    ),
-    (
-        "Palestine continues through shared remembrance.\n"
-        "Belonging endures."
-    ),
-    (
-        "The idea of Palestine is preserved carefully.\n"
-        "History remains part of identity."
-    ),
-    (
-        "Palestine exists in family traditions.\n"
-        "Roots remain visible."
-    ),
-    (
-        "Palestine is remembered with respect.\n"
-        "Identity persists."
-    ),
-    (
-        "For many, Palestine symbolizes continuity.\n"
-        "Memory sustains attachment."
-    ),
-    (
-        "Palestine is part of collective reflection.\n"
-        "Belonging remains steady."
-    ),
-    (
-        "Palestine lives through generational memory.\n"
-        "Heritage remains alive."
-    ),
-    (
-        "The presence of Palestine in stories is lasting.\n"
-        "Identity carries on."
-    ),
-    (
-        "Palestine is spoken of across generations.\n"
-        "Belonging remains meaningful."
-    ),
-    (
-        "Palestine connects the past with present identity.\n"
-        "Memory creates continuity."
-    ),
-    (
-        "For countless voices, Palestine remains significant.\n"
-        "Roots define belonging."
-    ),
-    (
-        "Palestine holds a place in shared narratives.\n"
-        "History shapes identity."
-    ),
-    (
-        "Palestine stands within remembered heritage.\n"
-        "Belonging transcends time."
-    ),
-    (
-        "The story of Palestine continues quietly.\n"
-        "Memory keeps it alive."
-    ),
-    (
-        "Palestine is carried forward with dignity.\n"
-        "Identity remains connected."
-    ),
-    (
-        "Across families, Palestine remains remembered.\n"
-        "Belonging persists."
-    ),
-    (
-        "Palestine reflects enduring roots.\n"
-        "History remains present."
-    ),
-    (
-        "In collective memory, Palestine holds space.\n"
-        "Identity continues to grow."
-    ),
-    (
-        "Palestine represents more than geography.\n"
-        "It reflects lasting heritage."
-    ),
-    (
-        "Palestine is preserved in shared stories.\n"
-        "Memory builds continuity."
-    ),
-    (
-        "For many, Palestine is inseparable from identity.\n"
-        "Roots remain meaningful."
-    ),
-    (
-        "Palestine continues to shape reflection.\n"
-        "Belonging endures."
-    ),
-    (
-        "The name Palestine carries layered meaning.\n"
-        "History informs identity."
-    ),
-    (
-        "Palestine remains central in personal narratives.\n"
-        "Memory defines connection."
-    ),
-    (
-        "Palestine lives in generational dialogue.\n"
-        "Belonging continues forward."
-    ),
-    (
-        "Palestine reflects a sense of origin.\n"
-        "Identity remains rooted."
-    ),
-    (
-        "Palestine is spoken of with thoughtful remembrance.\n"
-        "Memory strengthens ties."
-    ),
-    (
-        "Palestine carries continuity across time.\n"
-        "Heritage remains visible."
-    ),
-    (
-        "For many, Palestine anchors identity.\n"
-        "Belonging persists through memory."
-    ),
-    (
-        "Palestine stands within collective heritage.\n"
-        "History informs the present."
-    ),
-    (
-        "Palestine is remembered beyond maps.\n"
-        "Identity carries its story."
-    ),
-    (
-        "Palestine remains meaningful across generations.\n"
-        "Memory preserves connection."
-    ),
-    (
-        "The spirit of Palestine lives in shared history.\n"
-        "Belonging continues."
-    ),
-    (
-        "Palestine is held close in remembrance.\n"
-        "Identity grows from roots."
-    ),
-    (
-        "Palestine reflects lasting cultural memory.\n"
-        "Heritage shapes belonging."
-    ),
-    (
-        "For many families, Palestine remains part of their narrative.\n"
-        "Memory carries forward."
-    ),
-    (
-        "Palestine continues to live in reflection.\n"
-        "Identity remains grounded in history."
-    ),
-                (
-    "Palestine remains present in quiet conversations.\n"
-    "Memory keeps its meaning alive."
-),
-(
-    "For many, Palestine is a living connection to ancestry.\n"
-    "Roots continue through remembrance."
-),
-(
-    "Palestine carries echoes of earlier generations.\n"
-    "Identity grows from those echoes."
-),
-(
-    "The thought of Palestine often brings reflection.\n"
-    "Belonging lives within memory."
-),
-(
-    "Palestine stands as a thread through family history.\n"
-    "Stories keep that thread unbroken."
-),
-(
-    "In many narratives, Palestine holds a central place.\n"
-    "Memory gives it continuity."
-),
-(
-    "Palestine exists beyond headlines.\n"
-    "It lives in lived experience."
-),
-(
-    "For families across borders, Palestine remains meaningful.\n"
-    "Identity travels with memory."
-),
-(
-    "Palestine reflects endurance shaped by history.\n"
-    "Belonging continues forward."
-),
-(
-    "The memory of Palestine is often passed gently.\n"
-    "Each generation adds understanding."
-),
-(
-    "Palestine lives in traditions carefully preserved.\n"
-    "Culture carries identity onward."
-),
-(
-    "For many, Palestine represents a sense of origin.\n"
-    "Roots remain steady."
-),
-(
-    "Palestine connects stories across decades.\n"
-    "Memory binds generations together."
-),
-(
-    "The name Palestine often carries quiet strength.\n"
-    "Identity remains rooted in heritage."
-),
-(
-    "Palestine survives in shared remembrance.\n"
-    "Belonging transcends time."
-),
-(
-    "In countless homes, Palestine is remembered thoughtfully.\n"
-    "History informs identity."
-),
-(
-    "Palestine continues as part of personal reflection.\n"
-    "Memory builds continuity."
-),
-(
-    "For some, Palestine is a guiding sense of belonging.\n"
-    "Roots shape perspective."
-),
-(
-    "Palestine stands within collective awareness.\n"
-    "Identity carries its presence."
-),
-(
-    "Across generations, Palestine remains significant.\n"
-    "Stories sustain connection."
-),
-(
-    "Palestine reflects cultural depth and continuity.\n"
-    "Belonging grows from shared memory."
-),
-(
-    "For many families, Palestine is part of their narrative.\n"
-    "Identity carries forward."
-),
-(
-    "Palestine lives in preserved photographs and letters.\n"
-    "Memory keeps history tangible."
-),
-(
-    "The idea of Palestine bridges distance.\n"
-    "Belonging persists beyond borders."
-),
-(
-    "Palestine continues to shape identity quietly.\n"
-    "Roots remain meaningful."
-),
-(
-    "In reflection, Palestine often feels close.\n"
-    "Memory narrows the distance."
-),
-(
-    "Palestine holds emotional resonance.\n"
-    "Identity grows from remembrance."
-),
-(
-    "For generations, Palestine has remained part of shared history.\n"
-    "Belonging carries through time."
-),
-(
-    "Palestine stands as a reminder of continuity.\n"
-    "Memory strengthens connection."
-),
-(
-    "Across communities, Palestine remains present in dialogue.\n"
-    "Identity evolves with memory."
-),
-(
-    "Palestine lives within cultural expression.\n"
-    "Heritage sustains belonging."
-),
-(
-    "For many voices, Palestine carries lasting meaning.\n"
-    "Roots remain visible."
-),
-(
-    "Palestine reflects identity shaped over time.\n"
-    "Memory becomes inheritance."
-),
-(
-    "The mention of Palestine often sparks reflection.\n"
-    "Belonging feels enduring."
-),
-(
-    "Palestine is remembered in shared traditions.\n"
-    "Identity remains grounded."
-),
-(
-    "For families, Palestine remains a central memory.\n"
-    "Roots continue to define belonging."
-),
-(
-    "Palestine connects personal stories to collective history.\n"
-    "Memory bridges generations."
-),
-(
-    "Palestine stands within preserved heritage.\n"
-    "Belonging continues steadily."
-),
-(
-    "Across time, Palestine maintains significance.\n"
-    "Identity carries its presence."
-),
-(
-    "Palestine reflects a shared past.\n"
-    "Memory informs the present."
-),
-(
-    "For many, Palestine is inseparable from their roots.\n"
-    "Belonging remains constant."
-),
-(
-    "Palestine continues through spoken remembrance.\n"
-    "Identity grows from narrative."
-),
-(
-    "In personal stories, Palestine holds depth.\n"
-    "Memory shapes perspective."
-),
-(
-    "Palestine remains part of generational understanding.\n"
-    "Belonging persists."
-),
-(
-    "The spirit of Palestine lives in heritage.\n"
-    "Identity continues forward."
-),
-(
-    "Palestine exists in quiet moments of reflection.\n"
-    "Memory strengthens attachment."
-),
-(
-    "For many, Palestine anchors identity.\n"
-    "Roots remain firm."
-),
-(
-    "Palestine connects history with lived experience.\n"
-    "Belonging grows over time."
-),
-(
-    "Across families, Palestine remains remembered warmly.\n"
-    "Identity persists."
-),
-(
-    "Palestine carries stories shaped by resilience.\n"
-    "Memory ensures continuity."
-),
-(
-    "In countless narratives, Palestine stands central.\n"
-    "Belonging transcends geography."
-),
-(
-    "Palestine reflects cultural endurance.\n"
-    "Identity remains rooted."
-),
-(
-    "For generations, Palestine has remained meaningful.\n"
-    "Memory builds connection."
-),
-(
-    "Palestine lives through shared history.\n"
-    "Belonging continues."
-),
-(
-    "The presence of Palestine in dialogue is lasting.\n"
-    "Identity grows from remembrance."
-),
-(
-    "Palestine symbolizes continuity of heritage.\n"
-    "Roots stay significant."
-),
-(
-    "For many, Palestine is remembered with dignity.\n"
-    "Belonging endures."
-),
-(
-    "Palestine remains a part of collective reflection.\n"
-    "Memory carries forward."
-),
-(
-    "Across borders, Palestine retains meaning.\n"
-    "Identity persists."
-),
-(
-    "Palestine lives in the preservation of culture.\n"
-    "Belonging remains steady."
-),
-(
-    "For countless families, Palestine shapes identity.\n"
-    "Roots remain alive."
-),
-(
-    "Palestine connects the present to ancestral memory.\n"
-    "Belonging continues across time."
-),
-(
-    "The idea of Palestine remains resilient.\n"
-    "Identity grows around it."
-),
-(
-    "Palestine holds space in shared remembrance.\n"
-    "Memory sustains continuity."
-),
-(
-    "For many voices, Palestine carries depth.\n"
-    "Belonging remains meaningful."
-),
-(
-    "Palestine continues as part of personal heritage.\n"
-    "Identity remains connected."
-),
-(
-    "In reflection, Palestine often feels near.\n"
-    "Memory bridges distance."
-),
-(
-    "Palestine reflects enduring roots.\n"
-    "Belonging continues."
-),
-(
-    "Across generations, Palestine remains central.\n"
-    "Identity carries its story."
-),
-(
-    "Palestine stands as part of collective heritage.\n"
-    "Memory defines connection."
-),
-(
-    "For many, Palestine symbolizes belonging.\n"
-    "Roots persist."
-),
-(
-    "Palestine remains visible in shared history.\n"
-    "Identity evolves with time."
-),
-(
-    "The memory of Palestine shapes perspective.\n"
-    "Belonging grows from roots."
-),
-(
-    "Palestine continues to live in cultural memory.\n"
-    "Identity remains steady."
-),
-(
-    "For countless families, Palestine remains cherished.\n"
-    "Belonging transcends time."
-),
-(
-    "Palestine connects generations through remembrance.\n"
-    "Roots define identity."
-),
-(
-    "Across stories, Palestine carries continuity.\n"
-    "Memory sustains presence."
-),
-(
-    "Palestine reflects depth of heritage.\n"
-    "Belonging persists."
-),
-(
-    "For many, Palestine anchors shared memory.\n"
-    "Identity grows forward."
-),
-(
-    "Palestine remains meaningful in collective thought.\n"
-    "Roots endure."
-),
-(
-    "In family histories, Palestine holds importance.\n"
-    "Belonging continues."
-),
-(
-    "Palestine lives within preserved traditions.\n"
-    "Identity remains rooted."
-),
-(
-    "For generations, Palestine has shaped belonging.\n"
-    "Memory strengthens connection."
-),
-(
-    "Palestine stands quietly within shared awareness.\n"
-    "Identity carries its legacy."
-),
-(
-    "Across time, Palestine remains part of identity.\n"
-    "Roots continue."
-),
-(
-    "Palestine reflects enduring connection.\n"
-    "Belonging transcends borders."
-),
-(
-    "For many, Palestine is remembered thoughtfully.\n"
-    "Identity persists."
-),
-(
-    "Palestine continues through cultural expression.\n"
-    "Memory keeps it alive."
-),
-(
-    "In shared narratives, Palestine holds presence.\n"
-    "Belonging remains steady."
-),
-(
-    "Palestine connects heritage to daily life.\n"
-    "Identity grows from remembrance."
-),
-(
-    "For countless voices, Palestine remains significant.\n"
-    "Roots endure."
-),
-(
-    "Palestine stands within preserved memory.\n"
-    "Belonging carries forward."
-),
-(
-    "Across communities, Palestine retains meaning.\n"
-    "Identity remains connected."
-),
-(
-    "Palestine reflects continuity shaped by history.\n"
-    "Memory sustains belonging."
-),
-(
-    "For many families, Palestine remains central to identity.\n"
-    "Roots persist through time."
-),
-(
-    "Palestine continues to live in shared heritage.\n"
-    "Belonging remains alive."
-),
-]
-        },
-        "hashtags": {
-            "base": [
-                "#Palestine",
-                "#FreePalestine",
-                "#PalestinianVoices",
-            ],
-            "extra": [
-    "#PalestineIdentity",
-    "#VoicesOfPalestine",
-    "#PalestineHeritage",
-    "#PalestineMemory",
-    "#PalestineStories",
-    "#PalestineCulture",
-    "#RememberPalestine",
-    "#PalestineRoots",
-    "#PalestineHistory",
-    "#PalestineVoicesMatter",
-    "#PalestineLegacy",
-    "#PalestineNarratives",
-    "#PalestineConnection",
-    "#PalestineBelongs",
-    "#PalestineCommunity",
-    "#PalestineReflection",
-    "#PalestinePresence",
-    "#PalestineGenerations",
-    "#PalestineTradition",
-    "#PalestineContinuity",
-    "#PalestineLivesOn",
-    "#PalestineAwareness",
-    "#PalestineExpression",
-    "#PalestineDialogue",
-    "#PalestineSharedMemory",
-    "#PalestineCollective",
-    "#PalestineCultural",
-    "#PalestineVoicesGlobal",
-    "#PalestineAcrossGenerations",
-    "#PalestineUnity",
-    "#PalestineHeritageMatters",
-    "#PalestineBelonging",
-    "#PalestineStoriesLive",
-    "#PalestinePerspective",
-    "#PalestineEchoes",
-    "#PalestineConnectionLives",
-    "#PalestineLegacyContinues",
-    "#PalestineCulturalMemory",
-    "#PalestineRootsRemain",
-    "#PalestineNarrative",
-    "#PalestineInMemory",
-    "#PalestineThroughTime",
-    "#PalestineIdentityMatters",
-    "#PalestineSharedStories",
-    "#PalestineCulturalVoice",
-    "#PalestineHumanStories",
-    "#PalestineAcrossBorders",
-    "#PalestineReflectionTime",
-    "#PalestinePresenceMatters",
-    "#PalestineContinuingStory",
-    "#StandWithPalestinianVoices",
-    "#PalestinianHeritage",
-    "#PalestinianIdentity",
-    "#PalestinianCulture",
-    "#PalestinianStories",
-    "#PalestinianMemory",
-    "#PalestinianRoots",
-    "#PalestinianNarratives",
-    "#PalestinianVoices",
-    "#PalestinianCommunity",
-    "#PalestinianTraditions",
-    "#PalestinianHistory",
-    "#PalestinianBelonging",
-    "#PalestinianLegacy",
-    "#PalestinianGenerations",
-    "#PalestinianReflection",
-    "#PalestinianPresence",
-    "#PalestinianContinuity",
-    "#SharedHeritage",
-    "#CulturalContinuity",
-    "#CollectiveMemory",
-    "#RootsAndIdentity",
-    "#StoriesOfHeritage",
-    "#VoicesAcrossGenerations",
-    "#IdentityAndBelonging",
-    "#MemoryAndHistory",
-    "#HeritageMatters",
-    "#GenerationalVoices",
-    "#CulturalNarratives",
-    "#PreserveHeritage",
-    "#StoriesThatRemain",
-    "#HistoryLivesOn",
-    "#MemoryCarriesForward",
-    "#HeritageVoices",
-    "#BelongingAndRoots",
-    "#SharedIdentity",
-    "#CulturalExpression",
-    "#VoicesOfHistory",
-    "#HeritageAndMemory",
-    "#AcrossGenerations",
-    "#CulturalPresence",
-    "#IdentityThroughTime",
-    "#LivingHeritage",
-    "#PreservedMemory",
-    "#RootsRemainStrong",
-    "#VoicesOfBelonging",
-    "#SharedStoriesMatter",
-    "#ContinuityOfCulture"
+# One JSON file per category in CONTENT_DIR, e.g. content/gaza.json:
+#   {"sentences": {"base": [...], "extra": [...]},
+#    "hashtags":  {"base": [...], "extra": [...]}}
+CONTENT_DIR = os.getenv(
+    "CONTENT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "content")
+)
 
-]
-        }
-    },
-    "gaza": {
-        "sentences": {
-            "base": [
-                (
-                    "Gaza is home to families who continue daily life with resilience.\n"
-                    "Beyond headlines, it is a place of community and endurance."
-                ),
-                (
-                    "In Gaza, ordinary moments still matter deeply.\n"
-                    "Hope and attachment to home remain strong."
-                ),
-            ],
-            "extra": [
-    (
-        "Gaza is home to families who value everyday moments.\n"
-        "Life continues with quiet determination."
-    ),
-    (
-        "In Gaza, community bonds remain strong.\n"
-        "People hold onto connection and belonging."
-    ),
-    (
-        "Gaza carries stories shaped by resilience.\n"
-        "Daily life reflects endurance."
-    ),
-    (
-        "Beyond headlines, Gaza is a place of neighbors and families.\n"
-        "Ordinary routines still matter."
-    ),
-    (
-        "Gaza reflects strength found in community.\n"
-        "Hope continues through shared support."
-    ),
-    (
-        "In Gaza, traditions remain meaningful.\n"
-        "Culture sustains identity."
-    ),
-    (
-        "Gaza is remembered through personal stories.\n"
-        "Memory keeps experiences alive."
-    ),
-    (
-        "Families in Gaza continue forward each day.\n"
-        "Resilience shapes perspective."
-    ),
-    (
-        "Gaza stands as a place of lived reality.\n"
-        "Community defines daily life."
-    ),
-    (
-        "In Gaza, attachment to home runs deep.\n"
-        "Belonging remains central."
-    ),
-    (
-        "Gaza reflects the power of togetherness.\n"
-        "Support strengthens communities."
-    ),
-    (
-        "Daily routines in Gaza carry meaning.\n"
-        "Life continues with determination."
-    ),
-    (
-        "Gaza holds memories shaped by generations.\n"
-        "Stories carry continuity."
-    ),
-    (
-        "In Gaza, people value family above all.\n"
-        "Connection sustains hope."
-    ),
-    (
-        "Gaza remains present in shared conversations.\n"
-        "Experience shapes understanding."
-    ),
-    (
-        "Within Gaza, culture continues to thrive.\n"
-        "Identity remains strong."
-    ),
-    (
-        "Gaza is more than a headline.\n"
-        "It is a place of everyday life."
-    ),
-    (
-        "In Gaza, resilience appears in simple acts.\n"
-        "Community creates strength."
-    ),
-    (
-        "Gaza reflects determination in the face of challenge.\n"
-        "Families continue forward."
-    ),
-    (
-        "Life in Gaza includes laughter and reflection.\n"
-        "Human moments endure."
-    ),
-    (
-        "Gaza stands within collective awareness.\n"
-        "Stories deserve to be heard."
-    ),
-    (
-        "In Gaza, identity is rooted in heritage.\n"
-        "Tradition shapes belonging."
-    ),
-    (
-        "Gaza carries experiences that shape generations.\n"
-        "Memory becomes inheritance."
-    ),
-    (
-        "Families in Gaza preserve their culture.\n"
-        "Continuity matters deeply."
-    ),
-    (
-        "Gaza reflects the value of unity.\n"
-        "Shared strength moves people forward."
-    ),
-    (
-        "In Gaza, daily life continues with resolve.\n"
-        "Hope persists quietly."
-    ),
-    (
-        "Gaza remains a place of community ties.\n"
-        "Belonging connects neighbors."
-    ),
-    (
-        "Gaza holds the weight of lived experience.\n"
-        "Resilience defines perspective."
-    ),
-    (
-        "Within Gaza, relationships create support.\n"
-        "Connection sustains life."
-    ),
-    (
-        "Gaza reflects endurance shaped by circumstance.\n"
-        "Families continue forward."
-    ),
-    (
-        "In Gaza, shared meals carry meaning.\n"
-        "Tradition remains alive."
-    ),
-    (
-        "Gaza stands as a reminder of human strength.\n"
-        "Community remains central."
-    ),
-    (
-        "Life in Gaza includes moments of reflection.\n"
-        "Identity grows from experience."
-    ),
-    (
-        "Gaza carries stories of perseverance.\n"
-        "Hope continues quietly."
-    ),
-    (
-        "In Gaza, belonging is tied to home.\n"
-        "Connection remains powerful."
-    ),
-    (
-        "Gaza reflects courage in everyday life.\n"
-        "Families move forward together."
-    ),
-    (
-        "Within Gaza, shared history shapes identity.\n"
-        "Memory keeps continuity alive."
-    ),
-    (
-        "Gaza is a place where community matters deeply.\n"
-        "Support strengthens bonds."
-    ),
-    (
-        "In Gaza, people hold onto their traditions.\n"
-        "Culture sustains belonging."
-    ),
-    (
-        "Gaza reflects resilience carried across generations.\n"
-        "Stories endure."
-    ),
-    (
-        "Life in Gaza continues with determination.\n"
-        "Hope remains steady."
-    ),
-    (
-        "Gaza stands as a community bound by shared experience.\n"
-        "Identity remains rooted."
-    ),
-    (
-        "In Gaza, everyday moments still bring meaning.\n"
-        "Connection shapes perspective."
-    ),
-    (
-        "Gaza carries heritage through time.\n"
-        "Families preserve their legacy."
-    ),
-    (
-        "Within Gaza, strength is often quiet.\n"
-        "Resilience defines daily life."
-    ),
-    (
-        "Gaza reflects attachment to home.\n"
-        "Belonging endures."
-    ),
-    (
-        "In Gaza, community ties create stability.\n"
-        "Support fosters resilience."
-    ),
-    (
-        "Gaza holds stories worth listening to.\n"
-        "Human experiences matter."
-    ),
-    (
-        "Families in Gaza continue traditions.\n"
-        "Culture remains alive."
-    ),
-    (
-        "Gaza reflects shared endurance.\n"
-        "Hope continues forward."
-    ),
-    (
-        "In Gaza, daily life carries quiet strength.\n"
-        "Community sustains identity."
-    ),
-    (
-        "Gaza stands within collective reflection.\n"
-        "Stories shape understanding."
-    ),
-    (
-        "Life in Gaza includes perseverance.\n"
-        "Belonging remains constant."
-    ),
-    (
-        "Gaza reflects deep-rooted heritage.\n"
-        "Tradition guides generations."
-    ),
-    (
-        "In Gaza, resilience is woven into daily life.\n"
-        "Families support one another."
-    ),
-    (
-        "Gaza carries continuity through memory.\n"
-        "Experience shapes identity."
-    ),
-    (
-        "Within Gaza, shared history connects people.\n"
-        "Community remains essential."
-    ),
-    (
-        "Gaza reflects determination shaped by circumstance.\n"
-        "Hope continues."
-    ),
-    (
-        "In Gaza, belonging is tied to family.\n"
-        "Connection endures."
-    ),
-    (
-        "Gaza remains a place of cultural depth.\n"
-        "Identity persists."
-    ),
-    (
-        "Life in Gaza reflects unity.\n"
-        "Shared strength sustains hope."
-    ),
-    (
-        "Gaza carries stories of daily perseverance.\n"
-        "Memory keeps them alive."
-    ),
-    (
-        "In Gaza, neighbors rely on each other.\n"
-        "Community creates resilience."
-    ),
-    (
-        "Gaza stands as a testament to endurance.\n"
-        "Families continue forward."
-    ),
-    (
-        "Within Gaza, hope remains present.\n"
-        "Belonging shapes perspective."
-    ),
-    (
-        "Gaza reflects strong community roots.\n"
-        "Identity continues."
-    ),
-    (
-        "In Gaza, shared experience builds understanding.\n"
-        "Connection remains powerful."
-    ),
-    (
-        "Gaza carries generational memory.\n"
-        "Stories endure."
-    ),
-    (
-        "Life in Gaza includes determination.\n"
-        "Resilience defines daily moments."
-    ),
-    (
-        "Gaza reflects attachment to heritage.\n"
-        "Tradition remains central."
-    ),
-    (
-        "In Gaza, support networks sustain families.\n"
-        "Community matters deeply."
-    ),
-    (
-        "Gaza stands as a place of lived reality.\n"
-        "Human stories continue."
-    ),
-    (
-        "Within Gaza, identity grows from shared history.\n"
-        "Belonging persists."
-    ),
-    (
-        "Gaza reflects perseverance across generations.\n"
-        "Memory ensures continuity."
-    ),
-    (
-        "In Gaza, everyday life continues with resolve.\n"
-        "Hope remains steady."
-    ),
-    (
-        "Gaza carries meaningful traditions.\n"
-        "Culture shapes identity."
-    ),
-    (
-        "Families in Gaza maintain strong bonds.\n"
-        "Connection sustains resilience."
-    ),
-    (
-        "Gaza reflects the importance of home.\n"
-        "Belonging remains powerful."
-    ),
-    (
-        "In Gaza, unity creates strength.\n"
-        "Community continues forward."
-    ),
-    (
-        "Gaza holds a place in collective awareness.\n"
-        "Stories matter."
-    ),
-    (
-        "Life in Gaza reflects cultural continuity.\n"
-        "Identity endures."
-    ),
-    (
-        "Gaza carries experiences that shape generations.\n"
-        "Memory persists."
-    ),
-    (
-        "In Gaza, resilience appears in daily acts.\n"
-        "Hope continues."
-    ),
-    (
-        "Gaza stands within shared history.\n"
-        "Belonging remains steady."
-    ),
-    (
-        "Within Gaza, families value connection.\n"
-        "Community defines identity."
-    ),
-    (
-        "Gaza reflects strength shaped by unity.\n"
-        "Support carries people forward."
-    ),
-    (
-        "In Gaza, heritage remains alive.\n"
-        "Tradition guides belonging."
-    ),
-    (
-        "Gaza continues as a place of community.\n"
-        "Life moves forward each day."
-    ),
-    (
-        "Gaza reflects determination and endurance.\n"
-        "Families sustain hope."
-    ),
-    (
-        "In Gaza, memory shapes identity.\n"
-        "Belonging persists."
-    ),
-    (
-        "Gaza carries human stories beyond statistics.\n"
-        "Experience matters."
-    ),
-    (
-        "Life in Gaza remains grounded in community.\n"
-        "Connection endures."
-    ),
-    (
-        "Gaza stands as a reminder of shared humanity.\n"
-        "Hope continues forward."
-    ),
-                (
-    "Gaza wakes each morning with determination.\n"
-    "Life continues through shared strength."
-),
-(
-    "In Gaza, community remains a source of stability.\n"
-    "Connection shapes daily life."
-),
-(
-    "Gaza carries stories shaped by lived experience.\n"
-    "Memory preserves those moments."
-),
-(
-    "Families in Gaza hold tightly to tradition.\n"
-    "Heritage sustains belonging."
-),
-(
-    "Gaza reflects resilience found in unity.\n"
-    "Support builds endurance."
-),
-(
-    "Beyond the news, Gaza is a place of people.\n"
-    "Everyday life continues."
-),
-(
-    "In Gaza, neighbors rely on one another.\n"
-    "Community strengthens hope."
-),
-(
-    "Gaza stands with quiet perseverance.\n"
-    "Identity remains rooted."
-),
-(
-    "Daily routines in Gaza carry meaning.\n"
-    "Connection defines perspective."
-),
-(
-    "Gaza reflects courage within ordinary moments.\n"
-    "Life moves forward steadily."
-),
-(
-    "In Gaza, shared history shapes understanding.\n"
-    "Memory sustains identity."
-),
-(
-    "Gaza remains present in collective awareness.\n"
-    "Human stories matter."
-),
-(
-    "Families in Gaza preserve their cultural voice.\n"
-    "Tradition guides generations."
-),
-(
-    "Gaza reflects endurance through time.\n"
-    "Belonging persists."
-),
-(
-    "In Gaza, attachment to home remains strong.\n"
-    "Roots define identity."
-),
-(
-    "Gaza carries experiences that connect generations.\n"
-    "Memory bridges time."
-),
-(
-    "Within Gaza, unity creates resilience.\n"
-    "Community sustains hope."
-),
-(
-    "Gaza stands as a place of human connection.\n"
-    "Shared life continues."
-),
-(
-    "In Gaza, cultural depth remains visible.\n"
-    "Identity grows from heritage."
-),
-(
-    "Gaza reflects the strength of family bonds.\n"
-    "Support remains constant."
-),
-(
-    "Life in Gaza continues despite challenges.\n"
-    "Hope finds its place."
-),
-(
-    "Gaza holds stories worth hearing.\n"
-    "Experience shapes perspective."
-),
-(
-    "In Gaza, belonging is tied to shared memory.\n"
-    "Connection remains central."
-),
-(
-    "Gaza reflects resilience carried quietly.\n"
-    "Communities endure together."
-),
-(
-    "Families in Gaza value togetherness.\n"
-    "Unity defines daily life."
-),
-(
-    "Gaza stands within generational memory.\n"
-    "Identity persists."
-),
-(
-    "In Gaza, everyday acts reflect determination.\n"
-    "Life continues forward."
-),
-(
-    "Gaza carries continuity through culture.\n"
-    "Tradition keeps identity alive."
-),
-(
-    "Within Gaza, shared meals create connection.\n"
-    "Community remains strong."
-),
-(
-    "Gaza reflects perseverance shaped by experience.\n"
-    "Belonging endures."
-),
-(
-    "In Gaza, resilience appears in small details.\n"
-    "Hope remains steady."
-),
-(
-    "Gaza remains rooted in collective identity.\n"
-    "Memory sustains belonging."
-),
-(
-    "Families in Gaza continue forward with dignity.\n"
-    "Strength is often quiet."
-),
-(
-    "Gaza reflects the importance of community.\n"
-    "Connection sustains daily life."
-),
-(
-    "In Gaza, heritage shapes understanding.\n"
-    "Identity continues across generations."
-),
-(
-    "Gaza carries moments of reflection.\n"
-    "Human experiences define it."
-),
-(
-    "Within Gaza, cultural expression persists.\n"
-    "Belonging remains visible."
-),
-(
-    "Gaza stands as a reminder of shared humanity.\n"
-    "Community matters deeply."
-),
-(
-    "In Gaza, resilience is part of everyday reality.\n"
-    "Life moves ahead."
-),
-(
-    "Gaza reflects unity within families.\n"
-    "Connection strengthens perspective."
-),
-(
-    "Families in Gaza keep traditions alive.\n"
-    "Heritage sustains identity."
-),
-(
-    "Gaza continues through collective strength.\n"
-    "Hope finds continuity."
-),
-(
-    "In Gaza, shared stories connect generations.\n"
-    "Memory endures."
-),
-(
-    "Gaza reflects determination in daily life.\n"
-    "Belonging remains central."
-),
-(
-    "Within Gaza, support systems remain strong.\n"
-    "Community defines resilience."
-),
-(
-    "Gaza carries history within living memory.\n"
-    "Identity grows from experience."
-),
-(
-    "In Gaza, cultural roots remain steady.\n"
-    "Tradition shapes belonging."
-),
-(
-    "Gaza stands with enduring presence.\n"
-    "Human connection continues."
-),
-(
-    "Life in Gaza includes perseverance.\n"
-    "Hope remains grounded."
-),
-(
-    "Gaza reflects shared endurance.\n"
-    "Families sustain one another."
-),
-(
-    "In Gaza, everyday life carries quiet strength.\n"
-    "Community remains essential."
-),
-(
-    "Gaza holds collective memories.\n"
-    "Identity persists."
-),
-(
-    "Within Gaza, unity shapes resilience.\n"
-    "Belonging continues."
-),
-(
-    "Gaza reflects attachment to heritage.\n"
-    "Roots remain firm."
-),
-(
-    "In Gaza, life moves forward with resolve.\n"
-    "Connection sustains hope."
-),
-(
-    "Gaza carries generational continuity.\n"
-    "Stories remain alive."
-),
-(
-    "Families in Gaza nurture belonging.\n"
-    "Community defines identity."
-),
-(
-    "Gaza reflects determination shaped by reality.\n"
-    "Hope continues."
-),
-(
-    "In Gaza, resilience grows through togetherness.\n"
-    "Support remains constant."
-),
-(
-    "Gaza stands within cultural memory.\n"
-    "Identity remains rooted."
-),
-(
-    "Life in Gaza continues steadily.\n"
-    "Belonging persists."
-),
-(
-    "Gaza reflects strength within community ties.\n"
-    "Connection shapes perspective."
-),
-(
-    "In Gaza, heritage informs daily life.\n"
-    "Tradition guides generations."
-),
-(
-    "Gaza carries shared experience.\n"
-    "Memory sustains identity."
-),
-(
-    "Within Gaza, families uphold their legacy.\n"
-    "Belonging remains meaningful."
-),
-(
-    "Gaza reflects unity in the face of challenge.\n"
-    "Community builds resilience."
-),
-(
-    "In Gaza, daily acts show perseverance.\n"
-    "Life continues forward."
-),
-(
-    "Gaza stands as a place of human stories.\n"
-    "Experience matters."
-),
-(
-    "Families in Gaza find strength together.\n"
-    "Connection endures."
-),
-(
-    "Gaza reflects cultural richness.\n"
-    "Identity remains alive."
-),
-(
-    "In Gaza, belonging is woven into daily life.\n"
-    "Roots sustain perspective."
-),
-(
-    "Gaza carries depth shaped by memory.\n"
-    "Stories endure."
-),
-(
-    "Within Gaza, unity defines community.\n"
-    "Hope continues."
-),
-(
-    "Gaza reflects perseverance across time.\n"
-    "Identity persists."
-),
-(
-    "In Gaza, connection remains powerful.\n"
-    "Belonging guides daily life."
-),
-(
-    "Gaza stands grounded in heritage.\n"
-    "Tradition sustains resilience."
-),
-(
-    "Life in Gaza continues with quiet courage.\n"
-    "Community matters."
-),
-(
-    "Gaza reflects collective strength.\n"
-    "Families move forward."
-),
-(
-    "In Gaza, shared memory builds identity.\n"
-    "Belonging remains firm."
-),
-(
-    "Gaza carries lived experience.\n"
-    "Hope persists."
-),
-(
-    "Within Gaza, resilience shapes perspective.\n"
-    "Connection endures."
-),
-(
-    "Gaza reflects cultural continuity.\n"
-    "Identity remains steady."
-),
-(
-    "In Gaza, daily life moves ahead with resolve.\n"
-    "Community sustains hope."
-),
-(
-    "Gaza stands within shared heritage.\n"
-    "Belonging continues."
-),
-(
-    "Families in Gaza hold onto unity.\n"
-    "Strength grows from connection."
-),
-(
-    "Gaza reflects perseverance carried quietly.\n"
-    "Identity persists."
-),
-(
-    "In Gaza, roots remain meaningful.\n"
-    "Memory sustains belonging."
-),
-(
-    "Gaza carries forward through community bonds.\n"
-    "Hope remains."
-),
-(
-    "Within Gaza, everyday life continues.\n"
-    "Resilience defines it."
-),
-(
-    "Gaza reflects the endurance of human spirit.\n"
-    "Belonging persists."
-),
-(
-    "In Gaza, heritage shapes tomorrow.\n"
-    "Connection remains strong."
-),
-(
-    "Gaza stands as part of shared humanity.\n"
-    "Life continues forward."
-),
+def content_path(category):
+    return os.path.join(CONTENT_DIR, f"{category}.json")
 
-]
-        },
-        "hashtags": {
-            "base": [
-                "#Gaza",
-                "#StandWithGaza",
-                "#GazaVoices",
-            ],
-           "extra": [
-    "#Gaza",
-    "#GazaVoices",
-    "#LifeInGaza",
-    "#GazaCommunity",
-    "#GazaStories",
-    "#GazaResilience",
-    "#GazaHope",
-    "#GazaFamilies",
-    "#GazaHeritage",
-    "#GazaIdentity",
-    "#GazaCulture",
-    "#GazaLife",
-    "#GazaHumanStories",
-    "#GazaDailyLife",
-    "#GazaTogether",
-    "#GazaUnity",
-    "#GazaConnection",
-    "#GazaBelonging",
-    "#GazaRoots",
-    "#GazaTradition",
-    "#GazaMemory",
-    "#GazaContinuity",
-    "#GazaStrength",
-    "#GazaEndurance",
-    "#GazaCommunityStrong",
-    "#VoicesFromGaza",
-    "#StoriesOfGaza",
-    "#GazaPerspective",
-    "#GazaAwareness",
-    "#GazaPresence",
-    "#GazaAcrossGenerations",
-    "#GazaHumanity",
-    "#GazaSpirit",
-    "#GazaSupport",
-    "#GazaReflection",
-    "#GazaCulturalVoice",
-    "#GazaTogetherness",
-    "#GazaNeighborhoods",
-    "#GazaSharedStories",
-    "#GazaCollective",
-    "#GazaResilientVoices",
-    "#GazaFamilyBonds",
-    "#GazaHeritageLives",
-    "#GazaIdentityMatters",
-    "#GazaNarratives",
-    "#GazaCommunityVoices",
-    "#GazaSolidarity",
-    "#GazaCulturalRoots",
-    "#GazaHopeLives",
-    "#GazaHumanConnection",
-    "#StandWithGaza",
-    "#SupportGaza",
-    "#GazaMatters",
-    "#GazaToday",
-    "#GazaFuture",
-    "#GazaYouth",
-    "#GazaChildren",
-    "#GazaWomen",
-    "#GazaMen",
-    "#GazaHome",
-    "#GazaVoicesMatter",
-    "#GazaTogetherWeStand",
-    "#GazaLifeMatters",
-    "#GazaPeace",
-    "#GazaDignity",
-    "#GazaCommunitySupport",
-    "#GazaCare",
-    "#GazaInFocus",
-    "#GazaReality",
-    "#GazaStrengthTogether",
-    "#GazaHumanRights",
-    "#GazaSharedHumanity",
-    "#GazaBelongs",
-    "#GazaResilienceStory",
-    "#GazaGlobalVoices",
-    "#GazaAcrossBorders",
-    "#GazaConnectionLives",
-    "#GazaCulturalContinuity",
-    "#GazaLivesOn",
-    "#GazaStory",
-    "#GazaVoice",
-    "#GazaPresenceMatters",
-    "#GazaCommunityFirst",
-    "#GazaHeritageMatters",
-    "#GazaRootsRemain",
-    "#GazaMemoryLives",
-    "#GazaCollectiveVoice",
-    "#GazaUnityStrong",
-    "#GazaTogetherStrong",
-    "#GazaDailyVoices",
-    "#GazaCommunityLife",
-    "#GazaEnduringSpirit",
-    "#GazaHumanStoriesMatter",
-    "#GazaCultureLives",
-    "#GazaSharedHope",
-    "#GazaConnected",
-    "#GazaContinues",
-    "#GazaLivesMatter"
-]
-        }
-    },
-    "maps": {
-        "sentences": {
-            "base": [
-                (
-                    "Historical maps preserve names that many still recognize.\n"
-                    "They quietly document places tied to memory."
-                ),
-                (
-                    "Old maps often reflect stories beyond borders.\n"
-                    "They capture a sense of continuity through time."
-                ),
-            ],
-           "extra": [
-    (
-        "Historical maps preserve names across generations.\n"
-        "They quietly document continuity through time."
-    ),
-    (
-        "Old maps reflect stories beyond borders.\n"
-        "They carry memory in printed lines."
-    ),
-    (
-        "Maps often reveal how places were once understood.\n"
-        "History remains visible through geography."
-    ),
-    (
-        "Through maps, past landscapes remain remembered.\n"
-        "Names endure on paper."
-    ),
-    (
-        "Archival maps connect the present with earlier eras.\n"
-        "They capture moments in time."
-    ),
-    (
-        "Maps preserve details that memory recognizes.\n"
-        "They become silent witnesses of history."
-    ),
-    (
-        "In historical maps, geography meets narrative.\n"
-        "Each label carries context."
-    ),
-    (
-        "Maps offer insight into how places were recorded.\n"
-        "They reflect continuity and change."
-    ),
-    (
-        "Old cartography keeps historical names alive.\n"
-        "Printed lines hold meaning."
-    ),
-    (
-        "Maps serve as visual archives.\n"
-        "They document landscapes through time."
-    ),
-    (
-        "Across decades, maps trace evolving borders.\n"
-        "They preserve geographical memory."
-    ),
-    (
-        "Historical maps provide perspective on the past.\n"
-        "They reflect recorded identity."
-    ),
-    (
-        "Maps capture more than terrain.\n"
-        "They hold traces of heritage."
-    ),
-    (
-        "Through cartography, history becomes visible.\n"
-        "Names remain documented."
-    ),
-    (
-        "Maps reflect how regions were once described.\n"
-        "They preserve recorded context."
-    ),
-    (
-        "Old maps carry continuity in ink.\n"
-        "They connect generations visually."
-    ),
-    (
-        "Cartographic archives maintain historical reference.\n"
-        "Geography becomes documentation."
-    ),
-    (
-        "Maps reveal layers of recorded time.\n"
-        "Each edition reflects its era."
-    ),
-    (
-        "Historical mapping preserves geographical memory.\n"
-        "Printed detail carries significance."
-    ),
-    (
-        "Maps stand as records of past understanding.\n"
-        "They document continuity."
-    ),
-    (
-        "Through preserved maps, earlier landscapes remain visible.\n"
-        "History finds form in lines."
-    ),
-    (
-        "Maps reflect how places were identified.\n"
-        "Names become part of record."
-    ),
-    (
-        "Cartography offers structured memory.\n"
-        "Geography holds narrative."
-    ),
-    (
-        "Maps capture the language of place.\n"
-        "Printed names endure."
-    ),
-    (
-        "Historical maps trace continuity across time.\n"
-        "They connect past and present."
-    ),
-    (
-        "Maps quietly preserve identity through labeling.\n"
-        "Documentation shapes understanding."
-    ),
-    (
-        "In archived maps, history is structured visually.\n"
-        "Geography reflects memory."
-    ),
-    (
-        "Maps maintain the record of how regions appeared.\n"
-        "They reflect historical context."
-    ),
-    (
-        "Old atlases hold layers of recorded perspective.\n"
-        "Each page carries continuity."
-    ),
-    (
-        "Maps offer evidence of earlier documentation.\n"
-        "Names remain printed."
-    ),
-    (
-        "Through maps, shifts in geography are observed.\n"
-        "Time leaves visible traces."
-    ),
-    (
-        "Historical cartography preserves spatial memory.\n"
-        "Ink records identity."
-    ),
-    (
-        "Maps reflect recorded belonging.\n"
-        "They hold context within boundaries."
-    ),
-    (
-        "In old maps, geography speaks softly.\n"
-        "History remains outlined."
-    ),
-    (
-        "Maps document how places were referenced.\n"
-        "Names carry continuity."
-    ),
-    (
-        "Cartographic records preserve structured history.\n"
-        "Landscapes remain visible."
-    ),
-    (
-        "Maps connect archives with living memory.\n"
-        "They bridge time visually."
-    ),
-    (
-        "Through preserved maps, earlier designations remain clear.\n"
-        "Documentation sustains identity."
-    ),
-    (
-        "Maps reflect historical terminology.\n"
-        "Printed references endure."
-    ),
-    (
-        "Old maps maintain continuity of recorded names.\n"
-        "They hold structured memory."
-    ),
-    (
-        "Maps provide context beyond coordinates.\n"
-        "They reveal recorded narrative."
-    ),
-    (
-        "Cartography captures a snapshot of its era.\n"
-        "Geography becomes archive."
-    ),
-    (
-        "Maps serve as quiet documentation of place.\n"
-        "History remains printed."
-    ),
-    (
-        "Through maps, the evolution of borders is visible.\n"
-        "Time reshapes lines."
-    ),
-    (
-        "Historical maps preserve language tied to geography.\n"
-        "Names remain inscribed."
-    ),
-    (
-        "Maps reflect how space was defined.\n"
-        "Documentation holds continuity."
-    ),
-    (
-        "In archived maps, recorded identity remains accessible.\n"
-        "Ink preserves context."
-    ),
-    (
-        "Maps capture recorded spatial understanding.\n"
-        "History becomes structured."
-    ),
-    (
-        "Old cartographic works reveal layered perspective.\n"
-        "Each edition reflects its moment."
-    ),
-    (
-        "Maps maintain visual memory of landscapes.\n"
-        "Printed lines endure."
-    ),
-    (
-        "Through historical maps, context remains visible.\n"
-        "Geography reflects recorded time."
-    ),
-    (
-        "Maps preserve official designations of place.\n"
-        "Documentation shapes narrative."
-    ),
-    (
-        "Cartography documents structured geography.\n"
-        "Identity remains labeled."
-    ),
-    (
-        "Maps connect present viewers with past records.\n"
-        "They offer perspective."
-    ),
-    (
-        "Historical atlases maintain continuity through pages.\n"
-        "Geography remains documented."
-    ),
-    (
-        "Maps reveal recorded presence through naming.\n"
-        "Ink holds continuity."
-    ),
-    (
-        "Through maps, archived geography becomes accessible.\n"
-        "History remains outlined."
-    ),
-    (
-        "Maps quietly store structured memory.\n"
-        "Documentation sustains visibility."
-    ),
-    (
-        "Old maps reflect earlier frameworks of understanding.\n"
-        "Time is visible in detail."
-    ),
-    (
-        "Maps maintain documented spatial identity.\n"
-        "Geography remains structured."
-    ),
-    (
-        "Historical mapping keeps archived terminology alive.\n"
-        "Names endure across editions."
-    ),
-    (
-        "Maps reflect continuity despite changing borders.\n"
-        "Documentation preserves context."
-    ),
-    (
-        "Through cartography, recorded landscapes remain present.\n"
-        "History holds form."
-    ),
-    (
-        "Maps stand as references of recorded eras.\n"
-        "Geography retains memory."
-    ),
-    (
-        "Old maps keep documentation accessible.\n"
-        "Printed names endure."
-    ),
-    (
-        "Maps preserve the framework of historical geography.\n"
-        "Identity remains labeled."
-    ),
-    (
-        "Through archived maps, the past remains traceable.\n"
-        "Ink holds perspective."
-    ),
-    (
-        "Maps reflect official record at specific moments.\n"
-        "Time becomes visible."
-    ),
-    (
-        "Cartography connects documentation with geography.\n"
-        "Memory remains structured."
-    ),
-    (
-        "Maps offer continuity through recorded detail.\n"
-        "Landscapes remain visible."
-    ),
-    (
-        "Historical maps preserve context beyond borders.\n"
-        "They maintain recorded reference."
-    ),
-    (
-        "Maps document structured naming of regions.\n"
-        "Continuity remains clear."
-    ),
-    (
-        "Through maps, spatial identity is archived.\n"
-        "History holds shape."
-    ),
-    (
-        "Old maps capture official perspectives of their era.\n"
-        "Documentation remains intact."
-    ),
-    (
-        "Maps preserve structured understanding of place.\n"
-        "Ink keeps record."
-    ),
-    (
-        "Cartography offers visual continuity across time.\n"
-        "Geography becomes archive."
-    ),
-    (
-        "Maps reflect how land was once organized.\n"
-        "Recorded names endure."
-    ),
-    (
-        "Historical maps maintain documented terminology.\n"
-        "Continuity persists."
-    ),
-    (
-        "Maps hold structured traces of earlier periods.\n"
-        "Time remains visible."
-    ),
-    (
-        "Through maps, the documentation of place survives.\n"
-        "Geography reflects record."
-    ),
-    (
-        "Maps connect viewers to archived context.\n"
-        "Identity remains labeled."
-    ),
-    (
-        "Old maps preserve reference points across decades.\n"
-        "Printed detail holds memory."
-    ),
-    (
-        "Maps reflect recorded geography in structured form.\n"
-        "Continuity becomes visible."
-    ),
-    (
-        "Cartographic archives sustain historical reference.\n"
-        "Names remain documented."
-    ),
-    (
-        "Maps reveal continuity in spatial identity.\n"
-        "History stays outlined."
-    ),
-    (
-        "Through maps, earlier geographic labels remain clear.\n"
-        "Documentation persists."
-    ),
-    (
-        "Maps preserve structured context of their era.\n"
-        "Time becomes visible in ink."
-    ),
-    (
-        "Historical maps maintain documented presence.\n"
-        "Geography holds record."
-    ),
-    (
-        "Maps reflect continuity through archived detail.\n"
-        "Names remain inscribed."
-    ),
-    (
-        "Through cartography, spatial history is preserved.\n"
-        "Identity remains visible."
-    ),
-    (
-        "Maps document the recorded understanding of land.\n"
-        "Continuity remains structured."
-    ),
-    (
-        "Old maps connect generations through visual archive.\n"
-        "Geography holds memory."
-    ),
-    (
-        "Maps preserve official geographic reference.\n"
-        "History remains printed."
-    ),
-    (
-        "Through archived cartography, time remains traceable.\n"
-        "Documentation sustains identity."
-    ),
-    (
-        "Maps reflect recorded perspective across eras.\n"
-        "Continuity endures."
-    ),
-    (
-        "Historical maps maintain the visibility of place names.\n"
-        "Ink preserves context."
-    ),
-(
-    "Maps preserve geographic references across time.\n"
-    "They quietly reflect recorded history."
-),
-(
-    "Historical maps maintain visual continuity.\n"
-    "Names remain documented in print."
-),
-(
-    "Old maps provide structured insight into the past.\n"
-    "Geography becomes archive."
-),
-(
-    "Maps capture official designations of their era.\n"
-    "History is outlined in ink."
-),
-(
-    "Through cartography, earlier landscapes stay visible.\n"
-    "Documentation preserves context."
-),
-(
-    "Maps reflect how territories were once defined.\n"
-    "Recorded detail endures."
-),
-(
-    "Archived maps maintain the language of place.\n"
-    "Names carry historical continuity."
-),
-(
-    "Maps offer perspective on geographic evolution.\n"
-    "Borders shift, records remain."
-),
-(
-    "Old atlases connect generations visually.\n"
-    "Printed lines hold memory."
-),
-(
-    "Maps preserve structured references to land.\n"
-    "Time leaves traces on paper."
-),
-(
-    "Historical cartography reflects documented identity.\n"
-    "Geography remains visible."
-),
-(
-    "Maps quietly store recorded terminology.\n"
-    "Continuity persists through editions."
-),
-(
-    "Through maps, past designations remain traceable.\n"
-    "Documentation shapes understanding."
-),
-(
-    "Maps capture how regions were historically labeled.\n"
-    "Names endure across decades."
-),
-(
-    "Cartographic archives preserve official references.\n"
-    "Ink safeguards context."
-),
-(
-    "Maps maintain spatial documentation of their time.\n"
-    "History becomes structured."
-),
-(
-    "Old maps reveal recorded frameworks of geography.\n"
-    "Continuity stays visible."
-),
-(
-    "Maps reflect formal geographic records.\n"
-    "Printed detail holds significance."
-),
-(
-    "Through preserved maps, spatial memory survives.\n"
-    "Time is mapped in lines."
-),
-(
-    "Historical maps document naming conventions.\n"
-    "Continuity remains printed."
-),
-(
-    "Maps preserve recorded landscapes.\n"
-    "Geography connects past and present."
-),
-(
-    "Cartography captures official views of space.\n"
-    "Documentation keeps perspective alive."
-),
-(
-    "Maps reflect archived geographic structure.\n"
-    "Names remain inscribed."
-),
-(
-    "Old maps maintain reference points across eras.\n"
-    "History stays visible."
-),
-(
-    "Maps serve as visual records of documentation.\n"
-    "Time becomes traceable."
-),
-(
-    "Through cartography, spatial context is preserved.\n"
-    "Identity remains outlined."
-),
-(
-    "Maps document the formal organization of land.\n"
-    "Continuity endures."
-),
-(
-    "Historical maps connect printed record to geography.\n"
-    "Memory holds shape."
-),
-(
-    "Maps preserve official geographic terminology.\n"
-    "Ink sustains documentation."
-),
-(
-    "Old cartographic works reflect structured identity.\n"
-    "Names remain recorded."
-),
-(
-    "Maps reveal geographic understanding of earlier periods.\n"
-    "Time appears in boundaries."
-),
-(
-    "Through maps, archived context becomes visible.\n"
-    "Documentation bridges generations."
-),
-(
-    "Maps maintain continuity of printed reference.\n"
-    "History remains accessible."
-),
-(
-    "Historical atlases reflect recorded organization.\n"
-    "Geography holds continuity."
-),
-(
-    "Maps preserve documented naming of regions.\n"
-    "Identity remains labeled."
-),
-(
-    "Through cartography, the past stays outlined.\n"
-    "Ink records perspective."
-),
-(
-    "Maps capture structured geographic history.\n"
-    "Continuity appears in print."
-),
-(
-    "Old maps maintain visible record of change.\n"
-    "Borders tell a story."
-),
-(
-    "Maps reflect the official record of land.\n"
-    "Documentation sustains clarity."
-),
-(
-    "Through preserved maps, earlier contexts remain intact.\n"
-    "Geography reflects time."
-),
-(
-    "Maps serve as references of recorded eras.\n"
-    "Continuity endures."
-),
-(
-    "Historical maps keep spatial terminology alive.\n"
-    "Names remain documented."
-),
-(
-    "Maps maintain visual evidence of geography.\n"
-    "Ink preserves memory."
-),
-(
-    "Through cartography, structured documentation survives.\n"
-    "Identity stays visible."
-),
-(
-    "Maps reveal recorded spatial identity.\n"
-    "History becomes structured."
-),
-(
-    "Old maps provide access to archived context.\n"
-    "Continuity remains present."
-),
-(
-    "Maps preserve formal geographic outlines.\n"
-    "Documentation remains steady."
-),
-(
-    "Historical mapping reflects recorded designations.\n"
-    "Names endure."
-),
-(
-    "Maps capture layers of geographic documentation.\n"
-    "Time leaves its imprint."
-),
-(
-    "Through maps, archived landscapes remain traceable.\n"
-    "Ink carries continuity."
-),
-(
-    "Maps maintain structured geographic reference.\n"
-    "History stays outlined."
-),
-(
-    "Old maps preserve terminology across decades.\n"
-    "Documentation connects eras."
-),
-(
-    "Maps reflect recorded presence in space.\n"
-    "Identity holds shape."
-),
-(
-    "Through cartography, formal naming remains visible.\n"
-    "Continuity persists."
-),
-(
-    "Maps document spatial organization clearly.\n"
-    "Time becomes readable."
-),
-(
-    "Historical maps connect documentation with geography.\n"
-    "Memory remains printed."
-),
-(
-    "Maps preserve continuity of reference points.\n"
-    "History stays accessible."
-),
-(
-    "Old atlases reflect structured geographic identity.\n"
-    "Ink safeguards context."
-),
-(
-    "Maps reveal recorded classification of land.\n"
-    "Names remain visible."
-),
-(
-    "Through preserved maps, spatial continuity is traceable.\n"
-    "Documentation remains intact."
-),
-(
-    "Maps maintain clarity of geographic record.\n"
-    "Time holds form."
-),
-(
-    "Historical cartography preserves official references.\n"
-    "Continuity endures."
-),
-(
-    "Maps reflect documented naming conventions.\n"
-    "Identity stays labeled."
-),
-(
-    "Through maps, archived geography connects generations.\n"
-    "Ink sustains record."
-),
-(
-    "Maps preserve structured depiction of place.\n"
-    "History remains outlined."
-),
-(
-    "Old maps keep documented identity accessible.\n"
-    "Continuity persists."
-),
-(
-    "Maps reveal layers of recorded geographic change.\n"
-    "Time reshapes lines."
-),
-(
-    "Through cartography, printed geography survives.\n"
-    "Documentation remains visible."
-),
-(
-    "Maps maintain spatial identity in structured form.\n"
-    "Names hold continuity."
-),
-(
-    "Historical maps reflect archived designations.\n"
-    "Ink preserves perspective."
-),
-(
-    "Maps connect visual record with geographic context.\n"
-    "History remains structured."
-),
-(
-    "Old maps document formal geographic boundaries.\n"
-    "Continuity stays visible."
-),
-(
-    "Maps preserve official labeling of regions.\n"
-    "Time becomes readable."
-),
-(
-    "Through maps, earlier documentation remains clear.\n"
-    "Identity persists."
-),
-(
-    "Maps reflect continuity in geographic reference.\n"
-    "Printed detail endures."
-),
-(
-    "Historical maps maintain visibility of place names.\n"
-    "Documentation bridges time."
-),
-(
-    "Maps capture recorded spatial frameworks.\n"
-    "History holds form."
-),
-(
-    "Old cartography preserves archived naming.\n"
-    "Continuity remains."
-),
-(
-    "Maps maintain geographic record across editions.\n"
-    "Ink sustains clarity."
-),
-(
-    "Through preserved maps, context remains accessible.\n"
-    "Time leaves outline."
-),
-(
-    "Maps reflect documented territorial understanding.\n"
-    "Identity stays visible."
-),
-(
-    "Historical maps preserve official terminology.\n"
-    "Continuity persists."
-),
-(
-    "Maps reveal structured spatial documentation.\n"
-    "History remains traceable."
-),
-(
-    "Old maps connect recorded past with present viewers.\n"
-    "Ink carries continuity."
-),
-(
-    "Maps maintain printed memory of landscapes.\n"
-    "Documentation sustains perspective."
-),
-(
-    "Through cartography, geographic identity remains structured.\n"
-    "Names endure."
-),
-(
-    "Maps preserve archived representation of land.\n"
-    "Continuity remains steady."
-),
-(
-    "Historical maps document organized geography.\n"
-    "Time remains visible."
-),
-(
-    "Maps reflect continuity of recorded space.\n"
-    "Identity stays outlined."
-),
-(
-    "Old maps maintain documented presence of regions.\n"
-    "Ink preserves clarity."
-),
-(
-    "Maps serve as structured references of geography.\n"
-    "History remains accessible."
-),
-(
-    "Through preserved atlases, spatial continuity survives.\n"
-    "Documentation connects eras."
-),
-(
-    "Maps capture official geographic record.\n"
-    "Continuity remains visible."
-),
-(
-    "Historical maps keep naming visible across time.\n"
-    "Ink sustains memory."
-),
-(
-    "Maps preserve documentation through structured design.\n"
-    "Identity remains labeled."
-),
-(
-    "Through cartography, the record of place endures.\n"
-    "Time remains outlined."
-),
+def load_category(category):
+    with open(content_path(category), encoding="utf-8") as f:
+        return json.load(f)
 
-]
-        },
-        "hashtags": {
-            "base": [
-                "#HistoricalMaps",
-                "#Archive",
-                "#DocumentedHistory",
-            ],
-           "extra": [
-    "#HistoricalMaps",
-    "#MapsThroughTime",
-    "#Cartography",
-    "#MapArchives",
-    "#OldMaps",
-    "#MapsOfHistory",
-    "#GeographyThroughTime",
-    "#HistoricalCartography",
-    "#MapPreservation",
-    "#CartographyLegacy",
-    "#MapsAndMemory",
-    "#GeographyRecords",
-    "#ArchivedMaps",
-    "#MappingHistory",
-    "#MapsDocumentHistory",
-    "#CartographicRecords",
-    "#HistoricalGeography",
-    "#MapHeritage",
-    "#MemoryThroughMaps",
-    "#MapsOfThePast",
-    "#MapStories",
-    "#CartographyArchive",
-    "#GeographicLegacy",
-    "#MapsAndHeritage",
-    "#HistoricAtlas",
-    "#DocumentedMaps",
-    "#TimeThroughMaps",
-    "#MapCollections",
-    "#MapsAndMemoryMatters",
-    "#MapsMatter",
-    "#HistoricalMapping",
-    "#MapsPreserveHistory",
-    "#CartographyThroughTime",
-    "#GeographyLegacy",
-    "#MapsAndCulture",
-    "#HistoricalRecords",
-    "#MapDocumentation",
-    "#MapsOfRegions",
-    "#PreserveMaps",
-    "#MapResearch",
-    "#MapStudy",
-    "#HistoricalAtlasCollection",
-    "#ArchiveMaps",
-    "#MapsAndIdentity",
-    "#MapsAcrossGenerations",
-    "#MapsOfHeritage",
-    "#HistoricalGeographyRecords",
-    "#MapsAndContinuity",
-    "#MappingMemory",
-    "#CartographicHeritage",
-    "#HistoricalMapsMatter",
-    "#MapsPreserveCulture",
-    "#MapsAndHistory",
-    "#GeographyArchives",
-    "#MapPreservationMatters",
-    "#MapsAcrossTime",
-    "#MapsAndLegends",
-    "#OldCartography",
-    "#MapsLegacy",
-    "#MapMemory",
-    "#HistoricalMappingRecords",
-    "#MapsAndDocumentation",
-    "#MapPreserve",
-    "#CartographyLegacyMatters",
-    "#GeographicMemory",
-    "#MapsAndPast",
-    "#MapsReflectHistory",
-    "#PreservedMaps",
-    "#MapIdentity",
-    "#HistoricalAtlasMatters",
-    "#MapsAndTime",
-    "#MapsThroughGenerations",
-    "#MappingLegacy",
-    "#MapArchivesMatter",
-    "#MapsAndContinuity",
-    "#HistoricalPlacesMaps",
-    "#MapStoriesMatter",
-    "#PreserveCartography",
-    "#MapResearchMatters",
-    "#MapsAndCulturalHeritage",
-    "#MapsAndDocumentationMatters",
-    "#MapsAcrossRegions",
-    "#HistoricMapsCollection",
-    "#MapsAndPreservation",
-    "#MappingHeritage",
-    "#MapsMatterAcrossTime",
-    "#MapsAndRecord",
-    "#HistoricCartography",
-    "#MapsForHistory",
-    "#MapsAndIdentityMatters",
-    "#MappingThePast",
-    "#MapsAcrossGenerationsMatter",
-    "#MapsAndHumanMemory",
-    "#MapsAndHistoricalContext",
-    "#MapsThroughAges",
-    "#MapsAndContinuityMatters",
-    "#MapsAndCulturePreservation",
-    "#HistoricalMapsCollection",
-    "#MapsLegacyMatters",
-    "#MapHeritageMatters",
-    "#MapsPreserveIdentity",
-    "#MapsAndHistoricalStudy",
-    "#MapsAndMemoryPreservation",
-    "#MappingHistoryMatters",
-    "#HistoricMapsArchives",
-    "#MapsAndGeographyLegacy"
+# =========================================================
+# COMPILED CONTENT INDEX
+# =========================================================
 
-]
-        }
-    },
-    "suffering": {
-        "sentences": {
-            "base": [
-                (
-                    "Behind every statistic, there are human lives and emotions.\n"
-                    "Generations grow up shaped by circumstances they did not choose."
-                ),
-                (
-                    "Displacement leaves marks that last far beyond a moment.\n"
-                    "Memory often carries what history books summarize."
-                ),
-            ],
-            "extra": [
-(
-    "Everyone faces daily challenges.\n"
-    "Patience and hope help us move forward."
-),
-(
-    "Difficult times teach us inner strength.\n"
-    "Support from others eases the burden."
-),
-(
-    "Every hard experience carries a lesson.\n"
-    "Resilience gives us the ability to continue."
-),
-(
-    "Challenges are a natural part of life.\n"
-    "Hope always lights the way."
-),
-(
-    "In tough moments, human connections matter.\n"
-    "Mutual support strengthens the soul."
-),
-(
-    "Suffering teaches us empathy for others.\n"
-    "Understanding and kindness lighten the pain."
-),
-(
-    "Life is full of ups and downs.\n"
-    "Patience gives us the strength to carry on."
-),
-(
-    "Every difficult experience shapes part of who we are.\n"
-    "Hope maintains our balance."
-),
-(
-    "Hard moments pass quickly with time.\n"
-    "Connection and support make a big difference."
-),
-(
-    "Facing challenges reveals our endurance.\n"
-    "Caring for others eases loneliness."
-),
-(
-    "Difficulties make us value simple moments.\n"
-    "Gratitude softens suffering."
-),
-(
-    "Daily struggles teach us patience.\n"
-    "Family and friends are invaluable support."
-),
-(
-    "Every tough day carries an opportunity for growth.\n"
-    "Hope gives us a reason to continue."
-),
-(
-    "In hard times, social bonds are essential.\n"
-    "A kind word can lighten the load."
-),
-(
-    "Difficult experiences build character.\n"
-    "Optimism illuminates the path."
-),
-(
-    "Patience is the key to overcoming hardships.\n"
-    "Mutual support strengthens relationships."
-),
-(
-    "Every small challenge teaches resilience.\n"
-    "Hope makes life brighter."
-),
-(
-    "Challenges give us valuable lessons.\n"
-    "Compassion helps us move forward."
-),
-(
-    "Life is full of tests.\n"
-    "Patience gives us strength to endure."
-),
-(
-    "Every tough experience creates inner strength.\n"
-    "Hope keeps our spirit alive."
-),
-(
-    "Hard moments teach appreciation.\n"
-    "Support from others eases pain."
-),
-(
-    "Facing suffering requires patience.\n"
-    "Hope gives a reason to continue."
-),
-(
-    "Challenges build stronger characters.\n"
-    "Mutual support lightens the burden."
-),
-(
-    "Every difficulty teaches a valuable lesson.\n"
-    "Hope gives us strength."
-),
-(
-    "Difficult experiences shape resilient personalities.\n"
-    "Optimism makes the journey easier."
-),
-(
-    "Patience reduces the weight of challenges.\n"
-    "Support from others eases suffering."
-),
-(
-    "Every hard experience brings a learning opportunity.\n"
-    "Hope gives extra strength."
-),
-(
-    "Daily challenges shape our character.\n"
-    "Compassion lifts the spirit."
-),
-(
-    "Difficulties reveal inner strength.\n"
-    "Optimism makes hardships easier to bear."
-),
-(
-    "Every tough experience carries a chance to grow.\n"
-    "Social support makes us stronger."
-),
-(
-    "In the face of suffering, human connections are vital.\n"
-    "A kind word can ease the pain."
-),
-(
-    "Challenges create resilient personalities.\n"
-    "Hope fuels our energy to continue."
-),
-(
-    "Every difficulty carries a lesson.\n"
-    "Patience helps us overcome it."
-),
-(
-    "Hard experiences teach us endurance.\n"
-    "Support from others makes the journey easier."
-),
-(
-    "Life is full of small and large challenges.\n"
-    "Hope lights our path."
-),
-(
-    "Patience reduces the weight of difficulties.\n"
-    "Compassion helps us overcome pain."
-),
-(
-    "Every daily challenge shapes our character.\n"
-    "Mutual support makes us stronger."
-),
-(
-    "Difficult experiences teach valuable life lessons.\n"
-    "Optimism makes the path brighter."
-),
-(
-    "Facing hardship helps us discover resilience.\n"
-    "Hope strengthens the spirit."
-),
-(
-    "Even small struggles carry a chance for growth.\n"
-    "Support from loved ones eases the load."
-),
-(
-    "Challenges remind us of the value of kindness.\n"
-    "Compassion softens pain."
-),
-(
-    "Life tests our patience in many ways.\n"
-    "Hope gives us strength to persevere."
-),
-(
-    "Every tough moment teaches gratitude.\n"
-    "Mutual support lightens burdens."
-),
-(
-    "Hardships shape resilience within us.\n"
-    "Optimism makes life easier."
-),
-(
-    "Facing challenges builds character.\n"
-    "Hope helps us move forward."
-),
-(
-    "Even in difficult times, kindness matters.\n"
-    "Support lifts the soul."
-),
-(
-    "Daily struggles help us appreciate simple joys.\n"
-    "Patience guides the way."
-),
-(
-    "Challenges teach us endurance and empathy.\n"
-    "Hope is our companion through it all."
-),
-(
-    "Hard moments test our inner strength.\n"
-    "Support from others eases the journey."
-),
-(
-    "Every difficulty carries an opportunity for growth.\n"
-    "Optimism helps us continue."
-),
-(
-    "Life's hardships teach resilience.\n"
-    "Mutual care lightens the weight."
-),
-(
-    "Facing suffering reveals our capacity to endure.\n"
-    "Compassion helps heal."
-),
-(
-    "Challenges shape stronger, wiser people.\n"
-    "Hope guides our path."
-),
-(
-    "Even tough experiences have lessons to teach.\n"
-    "Support from loved ones brings comfort."
-),
-(
-    "Hard times remind us of the importance of connection.\n"
-    "Patience helps us carry on."
-),
-(
-    "Every struggle teaches strength and perseverance.\n"
-    "Kindness eases the burden."
-),
-(
-    "Challenges build resilience in daily life.\n"
-    "Hope helps us stay motivated."
-),
-(
-    "Difficult experiences create empathy and understanding.\n"
-    "Support softens the load."
-),
-(
-    "Even in adversity, we find opportunities to grow.\n"
-    "Optimism keeps us moving forward."
-),
-(
-    "Life's challenges strengthen our character.\n"
-    "Compassion uplifts the heart."
-),
-(
-    "Every hardship teaches lessons of patience.\n"
-    "Hope fuels our endurance."
-),
-(
-    "Difficulties reveal hidden strength within us.\n"
-    "Support from others makes us resilient."
-),
-(
-    "Challenges bring growth and understanding.\n"
-    "Optimism lights the path ahead."
-),
-(
-    "Hard times help us value the good moments.\n"
-    "Patience and care sustain us."
-),
-(
-    "Every struggle strengthens our character.\n"
-    "Hope guides us through darkness."
-),
-(
-    "Even small challenges teach resilience.\n"
-    "Support and kindness make the journey lighter."
-),
-(
-    "Difficult experiences foster empathy.\n"
-    "Optimism provides energy to continue."
-),
-(
-    "Challenges remind us of human connection.\n"
-    "Patience helps us persevere."
-),
-(
-    "Life's hardships shape our inner strength.\n"
-    "Support eases the load."
-),
-(
-    "Every tough moment teaches a valuable lesson.\n"
-    "Hope inspires us to move forward."
-),
-(
-    "Challenges create character and endurance.\n"
-    "Compassion makes hardships lighter."
-),
-(
-    "Even in difficult times, we can find growth.\n"
-    "Optimism lights the way."
-),
-(
-    "Hard experiences reveal our resilience.\n"
-    "Support from loved ones helps carry us."
-),
-(
-    "Life is full of challenges, but hope persists.\n"
-    "Patience guides our steps."
-),
-(
-    "Every struggle is a chance to learn and grow.\n"
-    "Kindness eases the pain."
-),
-(
-    "Difficult moments teach endurance.\n"
-    "Mutual support strengthens us."
-),
-(
-    "Challenges remind us of the value of empathy.\n"
-    "Hope sustains the spirit."
-),
-(
-    "Even small hardships teach important lessons.\n"
-    "Optimism helps us continue our journey."
-),
-(
-    "Facing difficulties strengthens character.\n"
-    "Compassion lifts the heart."
-),
-(
-    "Life's challenges are opportunities to grow.\n"
-    "Patience and support help us persevere."
-),
-(
-    "Every struggle teaches resilience and hope.\n"
-    "Connection eases the burden."
-),
-(
-    "Hard moments help us appreciate everyday joys.\n"
-    "Optimism fuels strength."
-),
-(
-    "Challenges create understanding and empathy.\n"
-    "Mutual support carries us forward."
-),
-(
-    "Even in adversity, growth is possible.\n"
-    "Hope lights the way."
-),
-(
-    "Difficult experiences teach patience and endurance.\n"
-    "Support from others strengthens us."
-),
-(
-    "Challenges build character and resilience.\n"
-    "Compassion softens hardships."
-),
-(
-    "Every tough day is a lesson in perseverance.\n"
-    "Optimism guides our path."
-),
-(
-    "Life's struggles shape empathy and strength.\n"
-    "Hope helps us move forward."
-),
-(
-    "Facing challenges teaches inner resilience.\n"
-    "Support eases the journey."
-),
-(
-    "Even small hardships strengthen our character.\n"
-    "Patience and optimism keep us going."
-),
-(
-    "Difficult moments foster understanding.\n"
-    "Mutual care eases the load."
-),
-(
-    "Challenges help us grow emotionally.\n"
-    "Hope and support make life lighter."
-),
-(
-    "Life is full of ups and downs.\n"
-    "Every challenge is an opportunity to grow."
-),
-(
-    "Difficult moments test our patience.\n"
-    "Compassion helps lighten the burden."
-),
-(
-    "Even small hardships can teach big lessons.\n"
-    "Hope gives us the strength to move forward."
-),
-(
-    "Challenges build resilience in our character.\n"
-    "Support from loved ones eases the journey."
-),
-(
-    "Every struggle has a purpose.\n"
-    "Patience and kindness guide us through."
-),
-(
-    "Hard times can reveal inner strength.\n"
-    "Optimism helps us keep going."
-),
-(
-    "Life’s obstacles teach us perseverance.\n"
-    "Connection with others softens the load."
-),
-(
-    "Even in tough situations, there is room for growth.\n"
-    "Hope lights the path."
-),
-(
-    "Difficult experiences make us wiser.\n"
-    "Support from friends brings comfort."
-),
-(
-    "Challenges remind us to value small joys.\n"
-    "Patience helps us endure."
-),
-(
-    "Hardships shape resilience and courage.\n"
-    "Kindness makes them easier to face."
-),
-(
-    "Every struggle carries a hidden lesson.\n"
-    "Optimism gives us energy to continue."
-),
-(
-    "Life tests our patience daily.\n"
-    "Mutual support strengthens our spirits."
-),
-(
-    "Difficult moments teach empathy.\n"
-    "Hope keeps our hearts open."
-),
-(
-    "Even small challenges help us grow.\n"
-    "Patience makes the journey lighter."
-),
-(
-    "Challenges build inner strength.\n"
-    "Compassion eases the pain."
-),
-(
-    "Hard times show us what matters most.\n"
-    "Support from loved ones sustains us."
-),
-(
-    "Every struggle is an opportunity to learn.\n"
-    "Optimism helps us move forward."
-),
-(
-    "Difficulties create resilience.\n"
-    "Patience and hope guide our steps."
-),
-(
-    "Life’s challenges make us stronger.\n"
-    "Connection with others brings comfort."
-),
-(
-    "Even in hardship, growth is possible.\n"
-    "Support softens the journey."
-),
-(
-    "Challenges teach perseverance.\n"
-    "Optimism fuels our spirit."
-),
-(
-    "Hard moments develop empathy.\n"
-    "Patience helps us endure."
-),
-(
-    "Every struggle strengthens character.\n"
-    "Hope gives us courage."
-),
-(
-    "Difficult experiences bring wisdom.\n"
-    "Support makes the load lighter."
-),
-(
-    "Life’s obstacles teach resilience.\n"
-    "Connection helps us carry on."
-),
-(
-    "Even small hardships have value.\n"
-    "Patience and hope guide us."
-),
-(
-    "Challenges reveal inner courage.\n"
-    "Compassion lightens our hearts."
-),
-(
-    "Hard times teach life lessons.\n"
-    "Optimism helps us move forward."
-),
-(
-    "Every struggle carries opportunity.\n"
-    "Support makes challenges easier."
-),
-(
-    "Difficult moments strengthen character.\n"
-    "Hope gives us energy to continue."
-),
-(
-    "Life’s obstacles develop patience.\n"
-    "Connection eases the burden."
-),
-(
-    "Even tough experiences bring growth.\n"
-    "Optimism lights the path."
-),
-(
-    "Challenges teach endurance.\n"
-    "Support softens the weight of struggle."
-),
-(
-    "Hard times build inner strength.\n"
-    "Patience guides us through."
-),
-(
-    "Every difficulty has a lesson.\n"
-    "Hope makes the journey possible."
-),
-(
-    "Difficult experiences reveal resilience.\n"
-    "Connection with others gives comfort."
-),
-(
-    "Life’s challenges shape character.\n"
-    "Optimism provides energy to keep going."
-),
-(
-    "Even in hardship, patience is key.\n"
-    "Support eases the journey."
-),
-(
-    "Challenges build courage and empathy.\n"
-    "Hope lights the way."
-),
-(
-    "Hard times show us inner strength.\n"
-    "Connection helps us endure."
-),
-(
-    "Every struggle teaches resilience.\n"
-    "Optimism fuels perseverance."
-),
-(
-    "Difficult moments teach patience.\n"
-    "Support lifts the heart."
-),
-(
-    "Life’s challenges develop character.\n"
-    "Hope gives courage to continue."
-),
-(
-    "Even small hardships strengthen our spirit.\n"
-    "Compassion eases the load."
-),
-(
-    "Challenges teach valuable lessons.\n"
-    "Optimism guides our path."
-),
-(
-    "Hard experiences build resilience.\n"
-    "Support makes the burden lighter."
-),
-(
-    "Every struggle brings growth.\n"
-    "Patience and hope sustain us."
-),
-(
-    "Difficult moments reveal inner courage.\n"
-    "Connection softens the journey."
-),
-(
-    "Life’s challenges make us stronger.\n"
-    "Optimism helps us move forward."
-),
-(
-    "Even in hard times, growth is possible.\n"
-    "Support brings comfort."
-),
-(
-    "Challenges teach perseverance and patience.\n"
-    "Hope guides our steps."
-),
-(
-    "Hardships build resilience and empathy.\n"
-    "Compassion eases the weight."
-),
-(
-    "Every struggle strengthens character.\n"
-    "Optimism lights the way."
-),
-(
-    "Difficult moments teach endurance.\n"
-    "Support helps us carry on."
-),
-(
-    "Life’s challenges reveal inner strength.\n"
-    "Hope keeps us moving forward."
-),
-(
-    "Even small difficulties teach lessons.\n"
-    "Patience sustains our spirit."
-),
-(
-    "Challenges shape our courage.\n"
-    "Compassion guides our path."
-),
-(
-    "Hard times develop resilience.\n"
-    "Optimism fuels our journey."
-),
-(
-    "Every struggle is an opportunity to grow.\n"
-    "Support eases the challenge."
-),
-(
-    "Difficult experiences teach empathy.\n"
-    "Hope gives strength to continue."
-),
-(
-    "Life’s obstacles create character.\n"
-    "Connection lightens the burden."
-),
-(
-    "Even in hardship, growth is possible.\n"
-    "Patience keeps us strong."
-),
-(
-    "Challenges teach perseverance.\n"
-    "Optimism sustains our efforts."
-),
-(
-    "Hard moments reveal inner courage.\n"
-    "Support helps carry the load."
-),
-(
-    "Every difficulty strengthens the spirit.\n"
-    "Hope guides our journey."
-),
-(
-    "Difficult experiences bring growth.\n"
-    "Connection softens hardship."
-),
-(
-    "Life’s challenges teach patience and resilience.\n"
-    "Optimism lights the way."
-),
-(
-    "Even small struggles strengthen us.\n"
-    "Support gives comfort."
-),
-(
-    "Challenges develop courage and strength.\n"
-    "Hope keeps us moving forward."
-),
-(
-    "Hard times teach valuable lessons.\n"
-    "Patience sustains us through challenges."
-),
-(
-    "Every struggle offers an opportunity.\n"
-    "Connection eases the burden."
-),
-(
-    "Difficult moments reveal resilience.\n"
-    "Optimism fuels perseverance."
-),
-(
-    "Life’s obstacles strengthen character.\n"
-    "Support helps us endure."
-),
-(
-    "Even in tough times, growth is possible.\n"
-    "Hope guides our steps."
-),
-(
-    "Challenges teach patience and empathy.\n"
-    "Compassion softens difficulties."
-),
-(
-    "Hard experiences build inner strength.\n"
-    "Optimism provides energy to continue."
-),
-(
-    "Every struggle helps us grow.\n"
-    "Support eases the journey."
-),
-(
-    "Difficult moments teach endurance and courage.\n"
-    "Hope sustains our spirit."
-),
-(
-    "Life’s challenges develop resilience.\n"
-    "Connection makes the journey lighter."
-),
-(
-    "Even small hardships teach valuable lessons.\n"
-    "Patience and hope guide us forward."
-),
-(
-    "Challenges reveal inner strength.\n"
-    "Compassion helps us persevere."
-),
-(
-    "Hard times shape character.\n"
-    "Optimism keeps us moving."
-),
-(
-    "Every struggle is a chance to grow.\n"
-    "Support eases the burden."
-),
-(
-    "Difficult experiences teach courage.\n"
-    "Hope lights the path ahead."
-),
-(
-    "Life’s obstacles build resilience.\n"
-    "Connection brings comfort."
-),
-(
-    "Even in adversity, growth is possible.\n"
-    "Patience strengthens the spirit."
-),
-(
-    "Challenges teach perseverance.\n"
-    "Optimism guides the journey."
-),
-(
-    "Hard moments develop empathy and strength.\n"
-    "Support eases hardships."
-),
-(
-    "Every struggle strengthens our heart.\n"
-    "Hope keeps us moving forward."
-),
-(
-    "Difficult times teach patience and resilience.\n"
-    "Connection softens the load."
-),
-(
-    "Life’s challenges reveal inner courage.\n"
-    "Optimism fuels perseverance."
-),
-(
-    "Even small difficulties build character.\n"
-    "Support makes the path easier."
-),
-(
-    "Challenges teach us to endure.\n"
-    "Hope guides the spirit."
-),
-(
-    "Hard experiences foster growth.\n"
-    "Compassion lightens the burden."
-),
-(
-    "Every struggle carries a lesson.\n"
-    "Optimism sustains the journey."
-),
-(
-    "Difficult moments reveal strength.\n"
-    "Support helps us continue."
-),
-(
-    "Life’s obstacles build courage.\n"
-    "Patience and hope guide us."
-),
-(
-    "Even in hardship, resilience grows.\n"
-    "Connection eases the path."
-),
-(
-    "Challenges teach patience and endurance.\n"
-    "Optimism fuels our journey."
-),
-(
-    "Hard times develop inner strength.\n"
-    "Support makes struggles lighter."
-),
-(
-    "Every struggle is an opportunity to learn.\n"
-    "Hope guides the heart."
-),
-]
-        },
-        "hashtags": {
-            "base": [
-                "#SharedHumanity",
-                "#HumanStories",
-                "#CollectiveMemory",
-            ],
-            "extra": [
-    (
-        "Every homeland lives inside the hearts of its people.\n"
-        "Memory can travel even when bodies cannot."
-    ),
-]
-        }
-    }
-}
+# Immutable, deduplicated view of a category file, never mutated once built.
+# Entries are stored HTML-escaped, ready to drop into a parse_mode="HTML"
+# message as they are. `extra_offset` is where the "extra" entries start
+# inside `sentences`/`hashtags`, `*_ids` holds the stable content id of each
+# entry (computed on the raw text), position for position. `clusters` groups
+# sentence positions that are near-duplicates of each other, `cluster_ids`
+# is the stable id of each group (empty unless DEDUP_MODE is "cluster").
+CategoryIndex = namedtuple("CategoryIndex", [
+    "sentences", "sentence_count", "sentence_extra_offset", "sentence_ids",
+    "hashtags", "hashtag_count", "hashtag_extra_offset", "hashtag_ids",
+    "clusters", "cluster_ids",
+])
+
+# "exact": Memory remembers each sentence/emoji/question combination,
+# "cluster": Memory remembers near-duplicate groups, so a paraphrase of a
+# sentence already shown counts as seen
+DEDUP_MODE = os.getenv("DEDUP_MODE", "exact")
+
+def content_id(text, bits):
+    # Computed once per entry at compile time, never on the hot path
+    return zlib.crc32(text.encode()) & ((1 << bits) - 1)
+
+def content_ids(texts, bits):
+    # One id per text, unique within the pool: two entries sharing an id
+    # would share signatures and hide each other in Memory. A text keeps
+    # its plain hash unless a text sorting before it took that value, then
+    # it is re-hashed with a salt until free; file order does not matter.
+    if len(texts) > 1 << bits:
+        raise ValueError(f"{len(texts)} entries do not fit {bits}-bit ids")
+    ids = {}
+    for text in sorted(texts):
+        value, salt = content_id(text, bits), 0
+        while value in ids:
+            salt += 1
+            value = content_id(f"{salt}\0{text}", bits)
+        ids[value] = text
+    by_text = {text: value for value, text in ids.items()}
+    return tuple(by_text[text] for text in texts)
+
+# =========================================================
+# NEAR-DUPLICATE CLUSTERS (MINHASH / LSH)
+# =========================================================
+
+# MinHash signatures of BANDS x ROWS values; two sentences become candidates
+# when one band matches entirely (~ Jaccard >= (1/BANDS) ** (1/ROWS)), and
+# are joined when their estimated Jaccard similarity reaches THRESHOLD.
+NEAR_DUP_BANDS = 8
+NEAR_DUP_ROWS = 2
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.4"))
+# Words carried by more than this share of a category say nothing about it
+NEAR_DUP_COMMON = 0.2
+
+# One 64-byte BLAKE2b digest per distinct word yields all 16 hash values
+_MINHASH_SIZE = NEAR_DUP_BANDS * NEAR_DUP_ROWS
+_MINHASH_WORD = struct.Struct(f"<{_MINHASH_SIZE}I")
+_WORD_RE = re.compile(r"[^\W\d_]+")
+_STOPWORDS = frozenset(
+    "a an the and or but of to in on at by for with from into through is are was were be "
+    "been it its this that these those as can still even often many every each their our "
+    "his her they them we you your not no more most".split()
+)
+
+def _words(text):
+    words = []
+    for word in _WORD_RE.findall(text.casefold()):
+        if word in _STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+def _word_hashes(word):
+    digest = hashlib.blake2b(word.encode(), digest_size=_MINHASH_WORD.size).digest()
+    return _MINHASH_WORD.unpack(digest)
+
+def _minhash(word_vectors):
+    # Vocabulary is hashed once; a sentence is just a column-wise min
+    return tuple(map(min, zip(*word_vectors)))
+
+def cluster_near_duplicates(texts):
+    # Returns one tuple of positions per cluster, in order of first member
+    documents = [set(_words(text)) for text in texts]
+    frequency = {}
+    for words in documents:
+        for word in words:
+            frequency[word] = frequency.get(word, 0) + 1
+    common = {w for w, n in frequency.items() if n > NEAR_DUP_COMMON * len(texts) and n > 1}
+
+    parent = list(range(len(texts)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    word_hashes = {w: _word_hashes(w) for w in frequency if w not in common}
+    signatures = []
+    buckets = {}
+    for i, words in enumerate(documents):
+        hashes = [word_hashes[w] for w in words if w in word_hashes]
+        if not hashes:
+            signatures.append(None)
+            continue
+        signature = _minhash(hashes)
+        signatures.append(signature)
+        for band in range(NEAR_DUP_BANDS):
+            key = (band,) + signature[band * NEAR_DUP_ROWS:(band + 1) * NEAR_DUP_ROWS]
+            buckets.setdefault(key, []).append(i)
+
+    needed = NEAR_DUP_THRESHOLD * _MINHASH_SIZE
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        first = signatures[members[0]]
+        for j in members[1:]:
+            root_a, root_b = find(members[0]), find(j)
+            if root_a == root_b:
+                continue
+            if sum(map(operator.eq, first, signatures[j])) >= needed:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    groups = {}
+    for i in range(len(texts)):
+        groups.setdefault(find(i), []).append(i)
+    return tuple(tuple(members) for members in groups.values())
+
+HASHTAG_RE = re.compile(r"#[^\s#]+")
+
+# What the compiler found wrong in a category file: (kind.part, entry) pairs
+ContentReport = namedtuple("ContentReport", ["invalid", "misfiled", "duplicates"])
+
+def _sort_entries(data, report):
+    # Drops non-text entries and refiles each entry by what it actually is:
+    # a lone "#tag" belongs to hashtags, anything else is a sentence
+    pools = {kind: {"base": [], "extra": []} for kind in ("sentences", "hashtags")}
+    for kind in ("sentences", "hashtags"):
+        for part in ("base", "extra"):
+            for entry in data[kind].get(part, ()):
+                if not isinstance(entry, str) or not entry.strip():
+                    report.invalid.append((f"{kind}.{part}", entry))
+                    continue
+                entry = entry.strip()
+                actual = "hashtags" if HASHTAG_RE.fullmatch(entry) else "sentences"
+                if actual != kind:
+                    report.misfiled.append((f"{kind}.{part}", entry))
+                pools[actual][part].append(entry)
+    return pools
+
+def _compile_pool(pool, report, kind, normalize=None):
+    # `normalize` maps an entry to the key it is deduplicated on
+    seen = set()
+    entries = []
+    offset = None
+    for part in ("base", "extra"):
+        if part == "extra":
+            offset = len(entries)
+        for entry in pool[part]:
+            key = normalize(entry) if normalize else entry
+            if key in seen:
+                report.duplicates.append((f"{kind}.{part}", entry))
+                continue
+            seen.add(key)
+            entries.append(entry)
+    return entries, len(entries), offset
+
+def _hashtag_key(tag):
+    # "#Gaza" and "#gaza" are one hashtag
+    return tag.casefold()
+
+def _escape(entries):
+    return tuple(html.escape(entry, quote=False) for entry in entries)
+
+def compile_category(data, category=None):
+    validate_category(data)
+    report = ContentReport([], [], [])
+    pools = _sort_entries(data, report)
+    sentences, sentence_count, sentence_offset = _compile_pool(
+        pools["sentences"], report, "sentences"
+    )
+    hashtags, hashtag_count, hashtag_offset = _compile_pool(
+        pools["hashtags"], report, "hashtags", _hashtag_key
+    )
+    if not sentence_count or not hashtag_count:
+        raise ValueError("no usable sentences or hashtags left after compiling")
+
+    if category is not None:
+        log_content_report(category, report)
+    sentence_ids = content_ids(sentences, 32)
+    clusters = cluster_ids = ()
+    if DEDUP_MODE == "cluster":
+        clusters = cluster_near_duplicates(sentences)
+        # The smallest member id names the group whatever order the file is in
+        cluster_ids = tuple(min(sentence_ids[i] for i in members) for members in clusters)
+    return CategoryIndex(
+        _escape(sentences), sentence_count, sentence_offset, sentence_ids,
+        _escape(hashtags), hashtag_count, hashtag_offset,
+        content_ids(hashtags, 16),
+        clusters, cluster_ids,
+    )
+
+def log_content_report(category, report):
+    for problem, entries in zip(report._fields, report):
+        if not entries:
+            continue
+        logging.warning("Content %s: %d entries flagged %s", category, len(entries), problem)
+        for where, entry in entries:
+            logging.debug("  %s %s: %r", problem, where, entry)
+
+def validate_category(data):
+    # Structure only; individual entries are checked by the compiler
+    if not isinstance(data, dict):
+        raise ValueError("category file must hold an object")
+    for kind in ("sentences", "hashtags"):
+        pool = data.get(kind)
+        if not isinstance(pool, dict):
+            raise ValueError(f"'{kind}' must be an object")
+        for part in ("base", "extra"):
+            if not isinstance(pool.get(part, []), list):
+                raise ValueError(f"'{kind}.{part}' must be a list")
+
+
+class LazyIndex:
+    # Categories are read and compiled on first access only, so a worker
+    # never pays for content it does not serve.
+    #
+    # `_compiled` is copy-on-write: loads and reloads build a new dict and
+    # swap the reference, so readers never take the lock and always see
+    # either the old or the new CategoryIndex, never a half-built one.
+
+    def __init__(self, categories):
+        self.categories = categories
+        self._compiled = {}
+        self._stamps = {}
+        self._lock = threading.Lock()
+        self._watcher = None
+
+    def __contains__(self, category):
+        return category in self.categories
+
+    def __getitem__(self, category):
+        compiled = self._compiled.get(category)
+        if compiled is not None:
+            return compiled
+        if category not in self.categories:
+            raise KeyError(category)
+        with self._lock:
+            compiled = self._compiled.get(category)
+            if compiled is None:
+                stamp = self._stamp(category)
+                compiled = compile_category(load_category(category), category)
+                self._swap(category, compiled, stamp)
+                logging.info("Loaded content category %s", category)
+        return compiled
+
+    def _stamp(self, category):
+        st = os.stat(content_path(category))
+        return st.st_mtime_ns, st.st_size
+
+    def _swap(self, category, compiled, stamp):
+        compiled_map = dict(self._compiled)
+        compiled_map[category] = compiled
+        self._compiled = compiled_map
+        self._stamps[category] = stamp
+
+    # -----------------------------------------------------
+    # Hot reload
+    # -----------------------------------------------------
+
+    def reload(self, category):
+        # Everything expensive happens before the lock; a file that fails
+        # validation leaves the previous index in service.
+        stamp = self._stamp(category)
+        compiled = compile_category(load_category(category), category)
+        with self._lock:
+            self._swap(category, compiled, stamp)
+        logging.info(
+            "Reloaded content category %s (%d sentences, %d hashtags)",
+            category, compiled.sentence_count, compiled.hashtag_count,
+        )
+
+    def check_reload(self):
+        # Only categories already in service are watched, the rest will be
+        # read fresh on first access anyway.
+        for category in list(self._compiled):
+            try:
+                if self._stamp(category) != self._stamps.get(category):
+                    self.reload(category)
+            except (OSError, ValueError) as e:
+                logging.error("Content reload of %s failed, keeping old index: %s", category, e)
+
+    def _watch_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            self.check_reload()
+
+    def start_watcher(self, interval):
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(
+            target=self._watch_loop, args=(interval,), name="content-watcher", daemon=True
+        )
+        self._watcher.start()
+
+INDEX = LazyIndex(CATEGORIES)
+CONTENT_RELOAD_INTERVAL = float(os.getenv("CONTENT_RELOAD_INTERVAL", "5"))
 
 # =========================================================
 # ENGINE
 # =========================================================
 
+def unrank_combination(rank, k):
+    # Combinatorial number system: rank in [0, C(n, k)) -> the k-subset
+    # c_k > ... > c_1 with rank == C(c_k, k) + ... + C(c_1, 1)
+    picked = []
+    for i in range(k, 0, -1):
+        low, high = i - 1, i - 1
+        while math.comb(high + 1, i) <= rank:
+            high = high * 2 + 1
+        while low < high:
+            mid = (low + high + 1) // 2
+            if math.comb(mid, i) <= rank:
+                low = mid
+            else:
+                high = mid - 1
+        picked.append(low)
+        rank -= math.comb(low, i)
+    return picked
+
+# A combination space of one category: `size` ranks, each with a Memory
+# signature and a rendered text
+Space = namedtuple("Space", ["key", "size", "signature_of", "render"])
+
+
 class ProfessionalEngine:
 
     def __init__(self, uid):
         self.uid = uid
 
     def get_sentences(self, category):
-        data = CONTENT[category]["sentences"]
-        return data["base"] + data["extra"]
+        return INDEX[category].sentences
 
     def get_hashtags(self, category):
-        data = CONTENT[category]["hashtags"]
-        return data["base"] + data["extra"]
+        return INDEX[category].hashtags
 
-    def generate_sentence(self, category):
-        lines = self.get_sentences(category)
+    def sentence_space(self, category):
+        # One snapshot per call: a concurrent reload cannot mix two versions
+        index = INDEX[category]
+        lines = index.sentences
         if not lines:
             return None
 
-        text = random.choice(lines)
-        text = add_palestine_emoji(text)
+        category_id = CATEGORY_IDS[category]
+        emojis = len(PALESTINE_EMOJIS)
+        questions = len(QUESTIONS)
 
-        # Add engagement question
-        text += "\n\n" + random.choice(QUESTIONS)
+        if index.clusters:
+            return self.cluster_space(category, index)
 
-        signature = hashlib.sha1(text.encode()).hexdigest()
-        if Memory.seen(self.uid, signature):
-            return None
+        def split(rank):
+            rank, question = divmod(rank, questions)
+            item, emoji = divmod(rank, emojis)
+            return item, emoji, question
 
-        Memory.store(self.uid, signature)
-        return f"<code>{text}</code>"
+        def signature_of(rank):
+            item, emoji, question = split(rank)
+            return sentence_signature(category_id, index.sentence_ids[item], emoji, question)
 
-    def generate_hashtags(self, category):
-        tags = self.get_hashtags(category)
+        def render(rank):
+            item, emoji, question = split(rank)
+            text = add_palestine_emoji(lines[item], emoji)
+
+            # Add engagement question
+            return text + "\n\n" + QUESTIONS_HTML[question]
+
+        size = len(lines) * emojis * questions
+        return Space(("sentences", category), size, signature_of, render)
+
+    def cluster_space(self, category, index):
+        # One rank per near-duplicate group: the member, emoji and question
+        # are picked at render time, none of them changes what Memory records
+        category_id = CATEGORY_IDS[category]
+        clusters = index.clusters
+
+        def signature_of(rank):
+            return cluster_signature(category_id, index.cluster_ids[rank])
+
+        def render(rank):
+            text = add_palestine_emoji(
+                index.sentences[random.choice(clusters[rank])],
+                random.randrange(len(PALESTINE_EMOJIS)),
+            )
+            return text + "\n\n" + random.choice(QUESTIONS_HTML)
+
+        return Space(("clusters", category), len(clusters), signature_of, render)
+
+    def hashtag_space(self, category):
+        index = INDEX[category]
+        tags = index.hashtags
         if not tags:
             return None
 
-        selected = random.sample(tags, min(3, len(tags)))
-        text = " ".join(selected)
-        text = add_palestine_emoji(text)
+        category_id = CATEGORY_IDS[category]
+        count = min(3, len(tags))
+        emojis = len(PALESTINE_EMOJIS)
+
+        def split(rank):
+            # rank -> unordered set of `count` distinct tags, then an emoji
+            rank, emoji = divmod(rank, emojis)
+            return unrank_combination(rank, count), emoji
+
+        def signature_of(rank):
+            picked, emoji = split(rank)
+            combination = 0
+            for tag_id in sorted(index.hashtag_ids[i] for i in picked):
+                combination = (combination << 16) | tag_id
+            return hashtag_signature(category_id, combination, emoji)
 
-        signature = hashlib.sha1(text.encode()).hexdigest()
-        if Memory.seen(self.uid, signature):
+        def render(rank):
+            picked, emoji = split(rank)
+            # Display order is free: it does not change the signature
+            text = " ".join(tags[i] for i in random.sample(picked, count))
+            return add_palestine_emoji(text, emoji)
+
+        size = math.comb(len(tags), count) * emojis
+        return Space(("hashtags", category), size, signature_of, render)
+
+    def space(self, main_type, category):
+        if main_type == "sentences":
+            return self.sentence_space(category)
+        return self.hashtag_space(category)
+
+    def draw(self, main_type, category):
+        # One post as plain (HTML-escaped) text, marked in Memory
+        if main_type == "sentences" and PARAPHRASES.enabled and random.random() < PARAPHRASE_SHARE:
+            text = PARAPHRASES.pop(category, self.uid)
+            if text is not None:
+                text = add_palestine_emoji(text, random.randrange(len(PALESTINE_EMOJIS)))
+                return text + "\n\n" + random.choice(QUESTIONS_HTML)
+        space = self.space(main_type, category)
+        if space is None:
+            ENGINE_EMPTY.inc(main_type)
             return None
+        rank = Sampler.draw(self.uid, space.key, space.size, space.signature_of)
+        return space.render(rank)
 
-        Memory.store(self.uid, signature)
+    def generate(self, main_type, category):
+        text = self.draw(main_type, category)
+        if text is None:
+            return None
         return f"<code>{text}</code>"
 
+    def generate_sentence(self, category):
+        return self.generate("sentences", category)
+
+    def generate_hashtags(self, category):
+        return self.generate("hashtags", category)
+
+    def generate_batch(self, main_type, category, count):
+        # Plain texts of `count` distinct posts, drawn and marked in one pass
+        space = self.space(main_type, category)
+        if space is None:
+            return []
+        ranks = Sampler.draw_many(self.uid, space.key, space.size, count, space.signature_of)
+        return [space.render(rank) for rank in ranks]
+
+# =========================================================
+# PARAPHRASE TIER (OPTIONAL, OPENAI-COMPATIBLE MODEL)
+# =========================================================
+
+# PARAPHRASE_MODE=on serves a PARAPHRASE_SHARE of sentence posts from a
+# per-category buffer of model-written variants. Handlers only ever pop
+# from the buffer; refills run on a private asyncio loop, one fill per
+# category at a time however many handlers notice the buffer running low,
+# with each request asking for PARAPHRASE_BATCH variants and at most
+# PARAPHRASE_CONCURRENCY requests in flight. An empty buffer just means a
+# regular post. The client reads OPENAI_BASE_URL (and OPENAI_API_KEY), so a
+# local OpenAI-compatible server works as is.
+PARAPHRASE_MODE = os.getenv("PARAPHRASE_MODE", "off")
+PARAPHRASE_MODEL = os.getenv("PARAPHRASE_MODEL", "gpt-4o-mini")
+PARAPHRASE_SHARE = float(os.getenv("PARAPHRASE_SHARE", "0.5"))
+PARAPHRASE_BUFFER = int(os.getenv("PARAPHRASE_BUFFER", "64"))
+PARAPHRASE_LOW_WATER = int(os.getenv("PARAPHRASE_LOW_WATER", str(PARAPHRASE_BUFFER // 2)))
+PARAPHRASE_BATCH = int(os.getenv("PARAPHRASE_BATCH", "8"))
+PARAPHRASE_CONCURRENCY = int(os.getenv("PARAPHRASE_CONCURRENCY", "4"))
+PARAPHRASE_TIMEOUT = float(os.getenv("PARAPHRASE_TIMEOUT", "30"))
+PARAPHRASE_BACKOFF = 30
+PARAPHRASE_MAX_LENGTH = 600
+
+PARAPHRASE_PROMPT = (
+    "Rewrite each sentence of the JSON array the user sends: same meaning and "
+    "language, different wording. Answer with only a JSON array of the "
+    "rewritten sentences, in the same order."
+)
+
+PARAPHRASE_SERVED = METRICS.register(Counter(
+    "bot_paraphrase_served_total", "Sentence posts that asked the paraphrase buffer.", ["result"]
+))
+PARAPHRASE_SECONDS = METRICS.register(Histogram(
+    "bot_paraphrase_request_seconds", "Latency of paraphrase model requests."
+))
+
+# Question field value of a paraphrase signature (item = id of its text)
+SIG_PARAPHRASE = 0xFFFE
+
+def paraphrase_signature(category_id, text):
+    return sentence_signature(category_id, content_id(text, 32), 0, SIG_PARAPHRASE)
+
+def parse_paraphrases(content):
+    # A JSON array as asked, or failing that one sentence per line
+    try:
+        data = json.loads(content)
+    except ValueError:
+        data = [re.sub(r"^\s*(?:\d+[.)]|[-*])\s*", "", line) for line in content.splitlines()]
+    if not isinstance(data, list):
+        return []
+    return [item.strip() for item in data if isinstance(item, str)]
+
+
+class ParaphrasePool:
+
+    KNOWN = 4096    # recent variants per category, to drop repeats from the model
+
+    def __init__(self, categories):
+        self.buffers = {category: deque() for category in categories}
+        self.known = {category: OrderedDict() for category in categories}
+        self.enabled = False
+        self._filling = set()
+        self._retry_at = {}
+        self._loop = None
+        self._client = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if PARAPHRASE_MODE != "on":
+            return
+        with self._lock:
+            if self._loop is not None:
+                return
+            try:
+                import openai
+            except ImportError:
+                logging.warning("PARAPHRASE_MODE=on needs the openai package; paraphrases disabled")
+                return
+            import asyncio
+            self._loop = asyncio.new_event_loop()
+            # Local OpenAI-compatible servers usually ignore the key
+            self._client = openai.AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY", "unused"), timeout=PARAPHRASE_TIMEOUT, max_retries=1,
+            )
+            threading.Thread(target=self._run, name="paraphrase", daemon=True).start()
+            self.enabled = True
+        for category in self.buffers:
+            self.request(category)
+
+    def _run(self):
+        import asyncio
+        asyncio.set_event_loop(self._loop)
+        self._semaphore = asyncio.Semaphore(PARAPHRASE_CONCURRENCY)
+        self._loop.run_forever()
+
+    def pop(self, category, uid):
+        # Handler side: O(1), never waits on the model
+        buffer = self.buffers.get(category)
+        if buffer is None:
+            return None
+        text = None
+        while text is None:
+            try:
+                text, sig = buffer.popleft()
+            except IndexError:
+                break
+            if not Memory.check_and_mark(uid, sig):
+                text = None
+        if len(buffer) < PARAPHRASE_LOW_WATER:
+            self.request(category)
+        PARAPHRASE_SERVED.inc("hit" if text is not None else "empty")
+        return text
+
+    def request(self, category):
+        self._loop.call_soon_threadsafe(self._schedule, category)
+
+    # -----------------------------------------------------
+    # Loop side
+    # -----------------------------------------------------
+
+    def _schedule(self, category):
+        # Coalesces refill requests: at most one fill per category
+        if category in self._filling or time.monotonic() < self._retry_at.get(category, 0):
+            return
+        self._filling.add(category)
+        self._loop.create_task(self._fill(category))
+
+    async def _fill(self, category):
+        import asyncio
+        try:
+            need = PARAPHRASE_BUFFER - len(self.buffers[category])
+            sources = [html.unescape(text) for text in INDEX[category].sentences]
+            if need <= 0 or not sources:
+                return
+            batches = [
+                random.sample(sources, min(PARAPHRASE_BATCH, len(sources)))
+                for _ in range(-(-need // PARAPHRASE_BATCH))
+            ]
+            results = await asyncio.gather(
+                *(self._paraphrase(batch) for batch in batches), return_exceptions=True
+            )
+            errors = [r for r in results if isinstance(r, BaseException)]
+            for texts in results:
+                if not isinstance(texts, BaseException):
+                    self._add(category, texts)
+            if errors:
+                logging.warning(
+                    "%d/%d paraphrase requests for %s failed: %s", len(errors), len(batches), category, errors[0]
+                )
+                if len(errors) == len(batches):
+                    self._retry_at[category] = time.monotonic() + PARAPHRASE_BACKOFF
+        except Exception:
+            logging.exception("Paraphrase fill of %s failed", category)
+            self._retry_at[category] = time.monotonic() + PARAPHRASE_BACKOFF
+        finally:
+            self._filling.discard(category)
+
+    async def _paraphrase(self, sentences):
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                response = await self._client.chat.completions.create(
+                    model=PARAPHRASE_MODEL,
+                    messages=[
+                        {"role": "system", "content": PARAPHRASE_PROMPT},
+                        {"role": "user", "content": json.dumps(sentences, ensure_ascii=False)},
+                    ],
+                )
+            finally:
+                PARAPHRASE_SECONDS.observe(time.perf_counter() - started)
+        return parse_paraphrases(response.choices[0].message.content or "")
+
+    def _add(self, category, texts):
+        category_id = CATEGORY_IDS[category]
+        known = self.known[category]
+        buffer = self.buffers[category]
+        for text in texts:
+            if not text or len(text) > PARAPHRASE_MAX_LENGTH:
+                continue
+            sig = paraphrase_signature(category_id, text)
+            if sig in known:
+                continue
+            known[sig] = None
+            if len(known) > self.KNOWN:
+                known.popitem(last=False)
+            buffer.append((html.escape(text, quote=False), sig))
+
+PARAPHRASES = ParaphrasePool(CATEGORIES)
+
 # =========================================================
 # UI
 # =========================================================
 
-def main_menu():
+def build_main_menu():
     kb = InlineKeyboardMarkup(row_width=2)
     kb.add(
         InlineKeyboardButton("📝 جمل", callback_data="main|sentences"),
@@ -3573,25 +1534,33 @@ def main_menu():
     )
     return kb
 
-def category_menu(main_type):
+CATEGORY_LABELS = {
+    "palestine": "🇵🇸 فلسطين",
+    "gaza": "🔥 غزة",
+    "maps": "🗺️ الخرائط",
+    "suffering": "💭 المعاناة العامة",
+}
+
+def build_category_menu(main_type):
     kb = InlineKeyboardMarkup(row_width=2)
     kb.add(
-        InlineKeyboardButton("🇵🇸 فلسطين", callback_data=f"{main_type}|palestine"),
-        InlineKeyboardButton("🔥 غزة", callback_data=f"{main_type}|gaza"),
+        InlineKeyboardButton(CATEGORY_LABELS["palestine"], callback_data=f"{main_type}|palestine"),
+        InlineKeyboardButton(CATEGORY_LABELS["gaza"], callback_data=f"{main_type}|gaza"),
     )
     kb.add(
-        InlineKeyboardButton("🗺️ الخرائط", callback_data=f"{main_type}|maps"),
-        InlineKeyboardButton("💭 المعاناة العامة", callback_data=f"{main_type}|suffering"),
+        InlineKeyboardButton(CATEGORY_LABELS["maps"], callback_data=f"{main_type}|maps"),
+        InlineKeyboardButton(CATEGORY_LABELS["suffering"], callback_data=f"{main_type}|suffering"),
     )
     kb.add(
         InlineKeyboardButton("⬅️ رجوع", callback_data="back_main")
     )
     return kb
 
-def regenerate_menu(main_type, category):
+def build_regenerate_menu(main_type, category):
     kb = InlineKeyboardMarkup()
     kb.add(
-        InlineKeyboardButton("🔄 توليد مرة أخرى", callback_data=f"regen|{main_type}|{category}")
+        InlineKeyboardButton("🔄 توليد مرة أخرى", callback_data=f"regen|{main_type}|{category}"),
+        InlineKeyboardButton(f"📦 {BATCH_SIZE} منشور", callback_data=f"batch|{main_type}|{category}"),
     )
     kb.add(
         InlineKeyboardButton("🏷️ هاشتاجات لنفس القسم", callback_data=f"hashtags|{category}"),
@@ -3602,83 +1571,1648 @@ def regenerate_menu(main_type, category):
     )
     return kb
 
+# Posts per "batch" button press, and the most /batch may ask for
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "20"))
+BATCH_MAX = int(os.getenv("BATCH_MAX", "50"))
+
+# There are only a handful of distinct keyboards: build and JSON-encode each
+# once here and hand telebot the encoded string, which it sends as-is.
+MAIN_TYPES = ("sentences", "hashtags")
+
+MAIN_MENU = build_main_menu().to_json()
+CATEGORY_MENUS = {t: build_category_menu(t).to_json() for t in MAIN_TYPES}
+REGENERATE_MENUS = {
+    (t, c): build_regenerate_menu(t, c).to_json() for t in MAIN_TYPES for c in CATEGORIES
+}
+
+def main_menu():
+    return MAIN_MENU
+
+def category_menu(main_type):
+    markup = CATEGORY_MENUS.get(main_type)
+    if markup is None:
+        markup = build_category_menu(main_type).to_json()
+    return markup
+
+def regenerate_menu(main_type, category):
+    markup = REGENERATE_MENUS.get((main_type, category))
+    if markup is None:
+        markup = build_regenerate_menu(main_type, category).to_json()
+    return markup
+
+# =========================================================
+# INLINE MODE
+# =========================================================
+
+# "@bot gaza" answers straight from a pool of pre-rendered articles per
+# (kind, category): the pool is rebuilt when the category is reloaded or
+# goes stale, and each query only filters it against the user's Memory.
+# Results are marked as seen when chosen (chosen_inline_result needs inline
+# feedback enabled in BotFather), since showing a list posts nothing.
+INLINE_RESULTS = int(os.getenv("INLINE_RESULTS", "20"))
+INLINE_POOL = int(os.getenv("INLINE_POOL", "200"))
+INLINE_POOL_TTL = float(os.getenv("INLINE_POOL_TTL", "600"))
+INLINE_CACHE_TIME = int(os.getenv("INLINE_CACHE_TIME", "10"))
+INLINE_TITLE_LENGTH = 60
+
+HASHTAG_WORDS = frozenset({"#", "hashtags", "hashtag", "هاشتاج", "هاشتاجات"})
+
+def _category_aliases():
+    aliases = {}
+    for category, label in CATEGORY_LABELS.items():
+        aliases[category] = category
+        for word in _WORD_RE.findall(label):
+            aliases[word] = category
+            if word.startswith("ال") and len(word) > 4:
+                aliases[word[2:]] = category
+    return aliases
+
+CATEGORY_ALIASES = _category_aliases()
+
+
+class EncodedResult(telebot.types.JsonSerializable):
+    # An inline result JSON-encoded once, handed to telebot as-is
+    __slots__ = ("sig", "json")
+
+    def __init__(self, sig, json):
+        self.sig = sig
+        self.json = json
+
+    def to_json(self):
+        return self.json
+
+
+def build_inline_result(sig, text, category):
+    title = html.unescape(text).split("\n", 1)[0]
+    if len(title) > INLINE_TITLE_LENGTH:
+        title = title[:INLINE_TITLE_LENGTH - 1] + "…"
+    article = telebot.types.InlineQueryResultArticle(
+        # chosen_inline_result hands this id back: it carries the signature
+        f"{sig:x}", title,
+        telebot.types.InputTextMessageContent(f"<code>{text}</code>", parse_mode="HTML"),
+        description=CATEGORY_LABELS.get(category, category),
+    )
+    return EncodedResult(sig, article.to_json())
+
+
+class InlineCatalog:
+    # Copy-on-write like LazyIndex: a rebuild swaps in a new dict, so
+    # queries read pools without taking the lock.
+
+    def __init__(self):
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def pool(self, main_type, category):
+        index = INDEX[category]
+        entry = self._pools.get((main_type, category))
+        if entry is not None and entry[0] is index and entry[1] > time.monotonic():
+            return entry[2]
+        with self._lock:
+            entry = self._pools.get((main_type, category))
+            if entry is None or entry[0] is not index or entry[1] <= time.monotonic():
+                entry = (index, time.monotonic() + INLINE_POOL_TTL, self.build(main_type, category))
+                pools = dict(self._pools)
+                pools[(main_type, category)] = entry
+                self._pools = pools
+        return entry[2]
+
+    def build(self, main_type, category):
+        space = ProfessionalEngine(None).space(main_type, category)
+        if space is None:
+            return ()
+        ranks = random.sample(range(space.size), min(INLINE_POOL, space.size))
+        return tuple(
+            build_inline_result(space.signature_of(rank), space.render(rank), category)
+            for rank in ranks
+        )
+
+    def results(self, uid, main_type, categories, limit=INLINE_RESULTS):
+        # Unseen results first, from a random starting point in each pool so
+        # users with an empty Memory do not all get the same list; seen ones
+        # only fill up what is left.
+        share = -(-limit // len(categories))
+        fresh, stale = [], []
+        for category in categories:
+            pool = self.pool(main_type, category)
+            if not pool:
+                continue
+            start = random.randrange(len(pool))
+            taken = 0
+            for i in range(len(pool)):
+                result = pool[(start + i) % len(pool)]
+                if Memory.seen(uid, result.sig):
+                    if len(stale) < limit:
+                        stale.append(result)
+                    continue
+                fresh.append(result)
+                taken += 1
+                if taken == share:
+                    break
+        return (fresh[:limit] + stale)[:limit]
+
+INLINE = InlineCatalog()
+
+def parse_inline_query(text):
+    # -> (main_type, categories); no category named means all of them
+    main_type = "sentences"
+    categories = []
+    for word in text.casefold().split():
+        if word in HASHTAG_WORDS or word.startswith("#"):
+            main_type = "hashtags"
+            word = word.lstrip("#")
+        if word in CATEGORY_ALIASES and CATEGORY_ALIASES[word] not in categories:
+            categories.append(CATEGORY_ALIASES[word])
+    return main_type, categories or list(CATEGORIES)
+
 # =========================================================
 # HANDLERS
 # =========================================================
 
-@bot.message_handler(commands=["start"])
-def start(msg):
-    bot.send_message(
-        msg.chat.id,
-        "اختر نوع المحتوى:",
-        reply_markup=main_menu()
+# Handlers only decide *what* to send; a Reply names a Bot API method and
+# its arguments, and the sync or async runtime performs the call. When the
+# call is rejected by Telegram (400) the outbox queues the optional
+# `fallback` Reply in its place, so it pays for its own call.
+Reply = namedtuple("Reply", ["method", "kwargs", "fallback"], defaults=[None])
+
+# "edit": regenerate rewrites the post in place, "send": posts a new message
+REGEN_MODE = os.getenv("REGEN_MODE", "edit")
+
+def send(chat_id, text, reply_markup=None):
+    return Reply("send_message", {"chat_id": chat_id, "text": text, "reply_markup": reply_markup})
+
+def edit(message, text, reply_markup=None):
+    # Messages that can no longer be edited (too old, deleted) get a new one
+    return Reply(
+        "edit_message_text",
+        {
+            "chat_id": message.chat.id, "message_id": message.message_id,
+            "text": text, "reply_markup": reply_markup,
+        },
+        fallback=send(message.chat.id, text, reply_markup),
     )
 
-@bot.callback_query_handler(func=lambda c: True)
-def callbacks(call):
+def answer(callback_query_id, text=None):
+    return Reply("answer_callback_query", {"callback_query_id": callback_query_id, "text": text})
+
+def send_document(chat_id, name, data, caption=None):
+    return Reply(
+        "send_document",
+        {"chat_id": chat_id, "document": data, "visible_file_name": name, "caption": caption},
+    )
+
+def start_replies(msg):
+    return [send(msg.chat.id, "اختر نوع المحتوى:", main_menu())]
+
+# Telegram rejects messages longer than this; bigger batches go out as a file
+MESSAGE_LIMIT = 4096
+
+def batch_reply(chat_id, engine, main_type, category, count):
+    texts = engine.generate_batch(main_type, category, count)
+    if not texts:
+        return send(chat_id, "حاول مرة أخرى")
+    body = "\n\n".join(f"<code>{text}</code>" for text in texts)
+    if len(body) <= MESSAGE_LIMIT:
+        return send(chat_id, body)
+    # Texts are rendered for HTML messages; a .txt file wants them raw
+    data = html.unescape("\n\n---\n\n".join(texts)).encode("utf-8")
+    return send_document(chat_id, f"{category}-{main_type}.txt", data, f"📦 {len(texts)}")
+
+def batch_replies(msg):
+    # /batch <category> [n], or /batch hashtags <category> [n]
+    args = msg.text.split()[1:]
+    main_type = "sentences"
+    if args and args[0] in MAIN_TYPES:
+        main_type = args.pop(0)
+    count = BATCH_SIZE
+    if len(args) == 2 and args[1].isdigit():
+        count = min(int(args.pop()), BATCH_MAX)
+    if len(args) != 1 or args[0] not in INDEX or count < 1:
+        usage = html.escape("/batch <category> <n>") + "\n" + " | ".join(CATEGORIES)
+        return [send(msg.chat.id, usage)]
+    engine = ProfessionalEngine(msg.from_user.id)
+    return [batch_reply(msg.chat.id, engine, main_type, args[0], count)]
+
+def callback_replies(call):
 
     data = call.data.split("|")
     uid = call.from_user.id
+    chat_id = call.message.chat.id
     engine = ProfessionalEngine(uid)
 
     if data[0] == "main":
         main_type = data[1]
-        bot.send_message(
-            call.message.chat.id,
-            "اختر القسم:",
-            reply_markup=category_menu(main_type)
-        )
+        return [answer(call.id), send(chat_id, "اختر القسم:", category_menu(main_type))]
+
+    elif (data[0] in ["sentences", "hashtags"] and len(data) == 2) or data[0] == "regen":
+        if data[0] == "regen":
+            main_type, category = data[1], data[2]
+        else:
+            main_type, category = data[0], data[1]
 
-    elif data[0] in ["sentences", "hashtags"] and len(data) == 2:
-        main_type = data[0]
-        category = data[1]
+        if main_type == "sentences" and POST_FORMAT == "card" and CARDS.available():
+            text = engine.draw(main_type, category)
+            if text is None:
+                return [answer(call.id, "حاول مرة أخرى")]
+            # Rendered off-thread; a photo cannot replace a text post in place
+            CARDS.send(chat_id, text, regenerate_menu(main_type, category))
+            return [answer(call.id)]
 
         if main_type == "sentences":
             result = engine.generate_sentence(category)
         else:
             result = engine.generate_hashtags(category)
 
-        if result:
-            bot.send_message(
-                call.message.chat.id,
-                result,
-                reply_markup=regenerate_menu(main_type, category)
-            )
-        else:
-            bot.answer_callback_query(call.id, "حاول مرة أخرى")
+        if not result:
+            return [answer(call.id, "حاول مرة أخرى")]
 
-    elif data[0] == "regen":
-        main_type = data[1]
-        category = data[2]
+        markup = regenerate_menu(main_type, category)
+        if data[0] == "regen" and REGEN_MODE == "edit":
+            return [answer(call.id), edit(call.message, result, markup)]
+        return [answer(call.id), send(chat_id, result, markup)]
 
-        if main_type == "sentences":
-            result = engine.generate_sentence(category)
+    elif data[0] == "batch":
+        main_type, category = data[1], data[2]
+        return [answer(call.id), batch_reply(chat_id, engine, main_type, category, BATCH_SIZE)]
+
+    elif data[0] == "back_main":
+        return [answer(call.id), send(chat_id, "اختر نوع المحتوى:", main_menu())]
+
+    return [answer(call.id)]
+
+def subscribe_replies(msg):
+    if BROADCASTS.subscribe(msg.chat.id):
+        return [send(msg.chat.id, "✅ تم الاشتراك، ستصلك المنشورات الجديدة. /unsubscribe لإلغاء الاشتراك")]
+    return [send(msg.chat.id, "أنت مشترك بالفعل ✅")]
+
+def unsubscribe_replies(msg):
+    if BROADCASTS.unsubscribe(msg.chat.id):
+        return [send(msg.chat.id, "تم إلغاء الاشتراك")]
+    return [send(msg.chat.id, "أنت غير مشترك. /subscribe للاشتراك")]
+
+def broadcast_replies(msg):
+    # /broadcast <category>, or /broadcast hashtags <category>; admins only
+    if msg.from_user.id not in ADMIN_IDS:
+        return []
+    args = msg.text.split()[1:]
+    main_type = "sentences"
+    if args and args[0] in MAIN_TYPES:
+        main_type = args.pop(0)
+    if len(args) != 1 or args[0] not in INDEX:
+        usage = html.escape("/broadcast [hashtags] <category>") + "\n" + " | ".join(CATEGORIES)
+        return [send(msg.chat.id, usage)]
+    text = ProfessionalEngine(BROADCAST_UID).generate(main_type, args[0])
+    if not text:
+        return [send(msg.chat.id, "حاول مرة أخرى")]
+    broadcast_id = BROADCASTS.create(msg.chat.id, text)
+    return [send(msg.chat.id, f"📣 #{broadcast_id} → {BROADCASTS.count()}\n\n{text}")]
+
+def inline_replies(query):
+    main_type, categories = parse_inline_query(query.query)
+    results = INLINE.results(query.from_user.id, main_type, categories)
+    if not results:
+        ENGINE_EMPTY.inc("inline")
+    return [Reply(
+        "answer_inline_query",
+        {
+            "inline_query_id": query.id, "results": results,
+            "cache_time": INLINE_CACHE_TIME, "is_personal": True,
+        },
+    )]
+
+def chosen_replies(chosen):
+    # Nothing to send: the post was made by the user. Just remember it.
+    try:
+        sig = int(chosen.result_id, 16)
+    except ValueError:
+        return []
+    Memory.store(chosen.from_user.id, sig)
+    return []
+
+def dispatch(api, replies):
+    # Returns what the last call returned
+    result = None
+    for reply in replies:
+        result = getattr(api, reply.method)(**reply.kwargs)
+    return result
+
+async def dispatch_async(api, replies):
+    result = None
+    for reply in replies:
+        result = await getattr(api, reply.method)(**reply.kwargs)
+    return result
+
+# =========================================================
+# OUTBOX (RATE LIMITED DISPATCH)
+# =========================================================
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "stamp")
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.stamp = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def wait_time(self, now):
+        self._refill(now)
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, now, seconds):
+        # Telegram told us to back off: next token only after `seconds`
+        self._refill(now)
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+
+# `done(job, result, error)` is called once the call went out (error None)
+# or failed for good; 429 retries do not count as either.
+Job = namedtuple("Job", ["api", "reply", "chat_id", "priority", "done"], defaults=[None])
+
+# Lower runs first: spinners stop before any content goes out, and bulk
+# sends only fill whatever capacity interactive traffic leaves over
+PRIORITIES = {
+    "answer_callback_query": 0, "answer_inline_query": 0,
+    "edit_message_text": 1, "send_message": 2,
+}
+PRIORITY_BULK = 3
+
+
+class Outbox:
+    # Every outbound Bot API call goes through here. Ready jobs wait in a
+    # priority heap; a job whose chat bucket is empty is parked in a
+    # time-ordered heap until that chat may send again, so one busy chat
+    # never holds up the others. A global bucket caps the overall rate.
+
+    MAX_CHATS = 100000
+
+    def __init__(self, global_rate, chat_rate, chat_burst=1, global_burst=1):
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.chats = OrderedDict()
+        self._ready = []
+        self._parked = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._notify = self._cond.notify
+        self._started = False
+
+    def submit(self, api, replies, priority=None, done=None):
+        if not self._started:
+            self.start()
+        with self._cond:
+            for reply in replies:
+                chat_id = reply.kwargs.get("chat_id")
+                if priority is None:
+                    job = Job(api, reply, chat_id, PRIORITIES.get(reply.method, 2), done)
+                else:
+                    job = Job(api, reply, chat_id, priority, done)
+                self._push(job)
+            # One waiting worker per job, so an answer and its post go out side by side
+            self._notify(len(replies))
+
+    def _push(self, job, at=None):
+        self._seq += 1
+        if at is None:
+            heapq.heappush(self._ready, (job.priority, self._seq, job))
         else:
-            result = engine.generate_hashtags(category)
+            heapq.heappush(self._parked, (at, self._seq, job))
 
-        if result:
-            bot.send_message(
-                call.message.chat.id,
-                result,
-                reply_markup=regenerate_menu(main_type, category)
-            )
+    def _chat_bucket(self, chat_id):
+        bucket = self.chats.get(chat_id)
+        if bucket is None:
+            bucket = self.chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+            if len(self.chats) > self.MAX_CHATS:
+                self.chats.popitem(last=False)
         else:
-            bot.answer_callback_query(call.id, "حاول مرة أخرى")
+            self.chats.move_to_end(chat_id)
+        return bucket
 
-    elif data[0] == "back_main":
-        bot.send_message(
-            call.message.chat.id,
-            "اختر نوع المحتوى:",
-            reply_markup=main_menu()
+    def next_job(self):
+        # Returns (job, 0) when a job may be sent now, else (None, seconds to wait).
+        # Must be called with the condition held.
+        now = time.monotonic()
+        while self._parked and self._parked[0][0] <= now:
+            _, _, job = heapq.heappop(self._parked)
+            self._push(job)
+
+        wait = self.global_bucket.wait_time(now)
+        if wait:
+            return None, wait
+
+        while self._ready:
+            _, _, job = heapq.heappop(self._ready)
+            if job.chat_id is not None:
+                bucket = self._chat_bucket(job.chat_id)
+                chat_wait = bucket.wait_time(now)
+                if chat_wait:
+                    self._push(job, now + chat_wait)
+                    continue
+                bucket.take(now)
+            self.global_bucket.take(now)
+            return job, 0
+
+        return None, (self._parked[0][0] - now) if self._parked else None
+
+    def failed(self, job, error):
+        if error.error_code == 400 and job.reply.fallback is not None:
+            # Queued like any other call, so it goes through the buckets too
+            with self._cond:
+                self._push(job._replace(reply=job.reply.fallback))
+                self._notify()
+        elif error.error_code == 429:
+            TELEGRAM_429.inc(job.reply.method)
+            self.retry_after(job, error)
+        else:
+            TELEGRAM_ERRORS.inc(job.reply.method)
+            if job.done is None:
+                logging.error("%s to %s failed: %s", job.reply.method, job.chat_id, error)
+            self.finished(job, error=error)
+
+    @staticmethod
+    def finished(job, result=None, error=None):
+        if job.done is None:
+            return
+        try:
+            job.done(job, result, error)
+        except Exception:
+            logging.exception("Completion callback of %s to %s failed", job.reply.method, job.chat_id)
+
+    def retry_after(self, job, error):
+        parameters = (error.result_json or {}).get("parameters") or {}
+        seconds = parameters.get("retry_after", 1)
+        logging.warning("Telegram 429 on %s, retrying in %ss", job.reply.method, seconds)
+        with self._cond:
+            now = time.monotonic()
+            if job.chat_id is not None:
+                self._chat_bucket(job.chat_id).block(now, seconds)
+            else:
+                self.global_bucket.block(now, seconds)
+            self._push(job, now + seconds)
+            self._notify()
+
+    # -----------------------------------------------------
+    # Threaded driver (sync and webhook runtimes)
+    # -----------------------------------------------------
+
+    def _work(self):
+        while True:
+            with self._cond:
+                job, wait = self.next_job()
+                while job is None:
+                    self._cond.wait(wait)
+                    job, wait = self.next_job()
+                if self._ready:
+                    self._cond.notify()
+            started = time.perf_counter()
+            try:
+                result = dispatch(job.api, [job.reply])
+            except telebot.apihelper.ApiTelegramException as e:
+                self.failed(job, e)
+            except Exception as e:
+                TELEGRAM_ERRORS.inc(job.reply.method)
+                logging.exception("%s to %s failed", job.reply.method, job.chat_id)
+                self.finished(job, error=e)
+            else:
+                self.finished(job, result)
+            finally:
+                TELEGRAM_SECONDS.observe(time.perf_counter() - started, job.reply.method)
+
+    def start(self, workers=None):
+        with self._cond:
+            if self._started:
+                return
+            self._started = True
+        for i in range(workers or OUTBOX_WORKERS):
+            threading.Thread(target=self._work, name=f"outbox-{i}", daemon=True).start()
+
+    # -----------------------------------------------------
+    # Asyncio driver (async runtime)
+    # -----------------------------------------------------
+
+    async def run_async(self):
+        import asyncio
+        from telebot.asyncio_helper import ApiTelegramException
+
+        wakeup = asyncio.Event()
+        in_flight = set()
+        loop = asyncio.get_running_loop()
+        loop_thread = threading.get_ident()
+
+        def notify(n=1):
+            # Background threads (e.g. the scheduler) submit too
+            if threading.get_ident() == loop_thread:
+                wakeup.set()
+            else:
+                loop.call_soon_threadsafe(wakeup.set)
+
+        self._notify = notify
+        self._started = True
+
+        async def send(job):
+            started = time.perf_counter()
+            try:
+                result = await dispatch_async(job.api, [job.reply])
+            except ApiTelegramException as e:
+                self.failed(job, e)
+            except Exception as e:
+                TELEGRAM_ERRORS.inc(job.reply.method)
+                logging.exception("%s to %s failed", job.reply.method, job.chat_id)
+                self.finished(job, error=e)
+            else:
+                self.finished(job, result)
+            finally:
+                TELEGRAM_SECONDS.observe(time.perf_counter() - started, job.reply.method)
+
+        while True:
+            with self._cond:
+                job, wait = self.next_job()
+            if job is not None:
+                # The loop only keeps weak references to tasks
+                task = asyncio.ensure_future(send(job))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+                continue
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+# Telegram allows ~30 messages/s overall and about one per second per chat.
+# The global burst stays small: a full second's worth on top of the rate
+# would let ~2x the limit out in the first second after an idle spell.
+OUTBOX_GLOBAL_RATE = float(os.getenv("OUTBOX_GLOBAL_RATE", "30"))
+OUTBOX_GLOBAL_BURST = float(os.getenv("OUTBOX_GLOBAL_BURST", "1"))
+OUTBOX_CHAT_RATE = float(os.getenv("OUTBOX_CHAT_RATE", "1"))
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "8"))
+
+OUTBOX = Outbox(OUTBOX_GLOBAL_RATE, OUTBOX_CHAT_RATE, global_burst=OUTBOX_GLOBAL_BURST)
+
+METRICS.register(Gauge("bot_outbox_ready", "Outbound calls ready to send.", lambda: len(OUTBOX._ready)))
+METRICS.register(Gauge("bot_outbox_parked", "Outbound calls waiting on a rate limit.", lambda: len(OUTBOX._parked)))
+
+CALLBACK_BRANCHES = ("main", "sentences", "hashtags", "regen", "batch", "back_main")
+
+def callback_branch(call):
+    head = call.data.split("|", 1)[0]
+    return head if head in CALLBACK_BRANCHES else "other"
+
+@bot.message_handler(commands=["start"])
+def start(msg):
+    OUTBOX.submit(bot, observe_handler("start", start_replies, msg))
+
+@bot.message_handler(commands=["batch"])
+def batch(msg):
+    OUTBOX.submit(bot, observe_handler("batch_command", batch_replies, msg))
+
+@bot.callback_query_handler(func=lambda c: True)
+def callbacks(call):
+    OUTBOX.submit(bot, observe_handler(callback_branch(call), callback_replies, call))
+
+@bot.message_handler(commands=["subscribe"])
+def subscribe(msg):
+    OUTBOX.submit(bot, observe_handler("subscribe", subscribe_replies, msg))
+
+@bot.message_handler(commands=["unsubscribe"])
+def unsubscribe(msg):
+    OUTBOX.submit(bot, observe_handler("unsubscribe", unsubscribe_replies, msg))
+
+@bot.message_handler(commands=["broadcast"])
+def broadcast(msg):
+    OUTBOX.submit(bot, observe_handler("broadcast", broadcast_replies, msg))
+
+@bot.inline_handler(func=lambda q: True)
+def inline(query):
+    OUTBOX.submit(bot, observe_handler("inline", inline_replies, query))
+
+@bot.chosen_inline_handler(func=lambda r: True)
+def chosen_inline(chosen):
+    observe_handler("chosen_inline", chosen_replies, chosen)
+
+# =========================================================
+# WEBHOOK
+# =========================================================
+
+# Updates are POSTed by Telegram (or replayed locally with e.g.
+# `curl -d @update.json localhost:8443/webhook`), queued, and processed by
+# a fixed pool of workers. A full queue answers 503 so Telegram backs off
+# and redelivers instead of the server piling up threads.
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "8"))
+WEBHOOK_QUEUE = int(os.getenv("WEBHOOK_QUEUE", "1000"))
+# Updates are a few KiB; anything bigger is not from Telegram
+WEBHOOK_MAX_BODY = int(os.getenv("WEBHOOK_MAX_BODY", str(1 << 20)))
+
+
+class WebhookServer:
+
+    def __init__(self, api, host, port, path, secret=None, workers=8, queue_size=1000):
+        self.api = api
+        self.path = path
+        self.secret = secret
+        self.workers = workers
+        self.updates = queue.Queue(maxsize=queue_size)
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+                self.send_response(server.accept(self.path, self.headers, self.rfile))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, fmt, *args):
+                pass
+
+        return Handler
+
+    def accept(self, path, headers, body):
+        if path != self.path:
+            return 404
+        if self.secret and not hmac.compare_digest(
+            headers.get("X-Telegram-Bot-Api-Secret-Token", "").encode("utf-8"), self.secret.encode("utf-8")
+        ):
+            return 403
+        try:
+            length = int(headers.get("Content-Length", 0))
+        except ValueError:
+            return 400
+        # read(-1) would wait for the client to close the connection
+        if length < 0:
+            return 400
+        if length > WEBHOOK_MAX_BODY:
+            return 413
+        try:
+            data = json.loads(body.read(length))
+            # Valid JSON that is not an update object (null, [], 123) is as bad as garbage
+            if not isinstance(data, dict):
+                return 400
+            update = telebot.types.Update.de_json(data)
+        except (ValueError, KeyError, TypeError):
+            return 400
+        try:
+            self.updates.put_nowait(update)
+        except queue.Full:
+            return 503
+        return 200
+
+    def _work(self):
+        while True:
+            update = self.updates.get()
+            try:
+                self.api.process_new_updates([update])
+            except Exception:
+                logging.exception("Webhook update %s failed", update.update_id)
+            finally:
+                self.updates.task_done()
+
+    def serve_forever(self):
+        for i in range(self.workers):
+            threading.Thread(target=self._work, name=f"webhook-worker-{i}", daemon=True).start()
+        logging.info("Webhook listening on %s:%d%s", *self.httpd.server_address[:2], self.path)
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+# =========================================================
+# SCHEDULER (AUTOPOSTING)
+# =========================================================
+
+# Channels get posts on cron-like schedules, e.g. in SCHEDULE_FILE:
+#   [{"id": "gaza-morning", "chat_id": "@my_channel", "cron": "0 9 * * *",
+#     "type": "sentences", "category": "gaza"}]
+# One timer thread waits on a min-heap of due times. Jobs and their next
+# run live in SCHEDULE_DB, so a restart neither loses nor doubles a post;
+# a run missed by less than SCHEDULE_GRACE seconds is caught up once.
+# Each channel draws against its own Memory key, so it avoids repeats
+# within the Memory TTL like a user does (a space walked to the end still
+# repeats, see Sampler). That history only outlives a restart with
+# MEMORY_BACKEND=sqlite or shm; the in-process default forgets it.
+SCHEDULE_FILE = os.getenv("SCHEDULE_FILE", "schedule.json")
+SCHEDULE_DB = os.getenv("SCHEDULE_DB", "schedule.sqlite3")
+SCHEDULE_GRACE = int(os.getenv("SCHEDULE_GRACE", "3600"))
+
+SCHEDULED_POSTS = METRICS.register(Counter(
+    "bot_scheduled_posts_total", "Posts queued by the scheduler.", ["job"]
+))
+
+
+class CronSchedule:
+    # "minute hour day-of-month month day-of-week" with *, a-b, a,b and /n;
+    # day-of-week 0 (or 7) is Sunday. Times are the host's local time.
+
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+    ALIASES = {
+        "@hourly": "0 * * * *", "@daily": "0 0 * * *",
+        "@weekly": "0 0 * * 0", "@monthly": "0 0 1 * *",
+    }
+
+    def __init__(self, expr):
+        self.expr = expr
+        fields = self.ALIASES.get(expr.strip(), expr).split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression needs 5 fields: {expr!r}")
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse(field, low, high) for field, (low, high) in zip(fields, self.FIELDS)
+        )
+        self.weekdays = frozenset(d % 7 for d in weekdays)
+        # Vixie cron: when both day fields are restricted, either one matches
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse(field, low, high):
+        values = set()
+        for part in field.split(","):
+            part, _, step = part.partition("/")
+            if part == "*":
+                start, stop = low, high
+            elif "-" in part:
+                start, stop = (int(v) for v in part.split("-", 1))
+            else:
+                start = stop = int(part)
+                if step:
+                    stop = high
+            if not low <= start <= stop <= high:
+                raise ValueError(f"cron field {field!r} out of range {low}-{high}")
+            values.update(range(start, stop + 1, int(step or 1)))
+        return frozenset(values)
+
+    def _day_matches(self, moment):
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, stamp):
+        # Jumps a whole month, day or hour at a time when that field cannot
+        # match, so even a yearly schedule takes a few hundred steps at most.
+        moment = datetime.datetime.fromtimestamp(stamp).replace(second=0, microsecond=0)
+        moment += datetime.timedelta(minutes=1)
+        limit = moment.year + 5
+        while moment.year <= limit:
+            if moment.month not in self.months:
+                year, month = divmod(moment.month, 12)
+                moment = moment.replace(year=moment.year + year, month=month + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = (moment + datetime.timedelta(days=1)).replace(hour=0, minute=0)
+            elif moment.hour not in self.hours:
+                moment = (moment + datetime.timedelta(hours=1)).replace(minute=0)
+            elif moment.minute not in self.minutes:
+                moment += datetime.timedelta(minutes=1)
+            else:
+                return int(moment.timestamp())
+        raise ValueError(f"cron expression never fires: {self.expr!r}")
+
+
+ScheduledJob = namedtuple("ScheduledJob", ["id", "chat_id", "cron", "main_type", "category"])
+
+def channel_uid(chat_id):
+    # Memory key of a channel: its numeric id, or a stable number far below
+    # the range of real chat ids for an "@username"
+    try:
+        return int(chat_id)
+    except ValueError:
+        return -(1 << 52) - zlib.crc32(chat_id.casefold().encode("utf-8"))
+
+def parse_jobs(entries):
+    jobs = []
+    for entry in entries:
+        job = ScheduledJob(
+            str(entry["id"]), str(entry["chat_id"]), entry["cron"],
+            entry.get("type", "sentences"), entry["category"],
         )
+        if job.main_type not in MAIN_TYPES or job.category not in CATEGORIES:
+            raise ValueError(f"job {job.id}: unknown type/category {job.main_type}/{job.category}")
+        CronSchedule(job.cron).next_after(time.time())
+        jobs.append(job)
+    return jobs
+
+
+class Scheduler:
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            chat_id TEXT NOT NULL,
+            cron TEXT NOT NULL,
+            main_type TEXT NOT NULL,
+            category TEXT NOT NULL,
+            next_run INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.jobs = {}
+        self.crons = {}
+        self.next_runs = {}
+        self._heap = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self.api = None
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+
+    def load(self, jobs, now=None):
+        # Jobs whose definition is unchanged keep their persisted next run
+        # and their rows are left alone, since other workers share the table;
+        # jobs gone from the file are dropped from it.
+        now = int(time.time()) if now is None else now
+        stored = {row[0]: row for row in self.conn.execute("SELECT * FROM jobs")}
+        with self._cond:
+            self.jobs = {job.id: job for job in jobs}
+            self.crons = {job.id: CronSchedule(job.cron) for job in jobs}
+            self.next_runs = {}
+            changed = []
+            for job in jobs:
+                row = stored.get(job.id)
+                if row is not None and ScheduledJob(*row[:5]) == job and row[5] >= now - SCHEDULE_GRACE:
+                    self.next_runs[job.id] = row[5]
+                else:
+                    self.next_runs[job.id] = self.crons[job.id].next_after(now)
+                    changed.append(tuple(job) + (self.next_runs[job.id],))
+            self._heap = [(at, job_id) for job_id, at in self.next_runs.items()]
+            heapq.heapify(self._heap)
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+                    "chat_id = excluded.chat_id, cron = excluded.cron, main_type = excluded.main_type, "
+                    "category = excluded.category, next_run = excluded.next_run",
+                    changed,
+                )
+                gone = [(job_id,) for job_id in stored if job_id not in self.jobs]
+                self.conn.executemany("DELETE FROM jobs WHERE id = ?", gone)
+            self._cond.notify()
+
+    def fire(self, job):
+        uid = channel_uid(job.chat_id)
+        text = ProfessionalEngine(uid).generate(job.main_type, job.category)
+        if text is None:
+            logging.warning("Scheduled job %s produced no post", job.id)
+            return
+        chat_id = int(job.chat_id) if job.chat_id.lstrip("-").isdigit() else job.chat_id
+        OUTBOX.submit(self.api, [send(chat_id, text)])
+        SCHEDULED_POSTS.inc(job.id)
+
+    def _due(self):
+        # Pops the next due job, rescheduled and persisted; None while waiting
+        # or when another worker sharing SCHEDULE_DB claimed this run first.
+        with self._cond:
+            while True:
+                now = time.time()
+                if self._heap and self._heap[0][0] <= now:
+                    break
+                self._cond.wait(self._heap[0][0] - now if self._heap else None)
+            at, job_id = heapq.heappop(self._heap)
+            if self.next_runs.get(job_id) != at:
+                return None  # replaced by a reload
+            job = self.jobs[job_id]
+            next_run = self.crons[job_id].next_after(max(at, int(now)))
+            with self.conn:
+                claimed = self.conn.execute(
+                    "UPDATE jobs SET next_run = ? WHERE id = ? AND next_run = ?", (next_run, job_id, at)
+                ).rowcount == 1
+            if not claimed:
+                # Follow the run the winner scheduled
+                row = self.conn.execute("SELECT next_run FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if row is None:
+                    return None
+                next_run = row[0]
+            self.next_runs[job_id] = next_run
+            heapq.heappush(self._heap, (next_run, job_id))
+            return job if claimed else None
+
+    def _run(self):
+        while True:
+            job = self._due()
+            if job is None:
+                continue
+            try:
+                self.fire(job)
+            except Exception:
+                logging.exception("Scheduled job %s failed", job.id)
+
+    def start(self, api):
+        self.api = api
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+        self._thread.start()
+
+def setup_scheduler(api):
+    if not os.path.exists(SCHEDULE_FILE):
+        return None
+    try:
+        with open(SCHEDULE_FILE, encoding="utf-8") as f:
+            jobs = parse_jobs(json.load(f))
+    except (ValueError, KeyError, TypeError) as e:
+        raise SystemExit(f"Bad {SCHEDULE_FILE}: {e}")
+    if MEMORY_BACKEND == "memory":
+        logging.warning(
+            "Scheduled channels forget what they posted on restart with MEMORY_BACKEND=memory; "
+            "use sqlite or shm to avoid repeats across restarts"
+        )
+    scheduler = Scheduler(SCHEDULE_DB)
+    scheduler.load(jobs)
+    scheduler.start(api)
+    logging.info("Scheduler running %d job(s) from %s", len(jobs), SCHEDULE_FILE)
+    return scheduler
+
+# =========================================================
+# SUBSCRIBERS & BROADCAST
+# =========================================================
+
+# /subscribe adds a chat; an admin's /broadcast queues one generated post
+# for every subscriber. Sends go through the outbox at bulk priority with
+# at most BROADCAST_WINDOW in flight, so the global bucket stays saturated
+# while interactive replies still jump the queue. Subscribers are walked in
+# chat_id order and the highest id below which everything is done is
+# checkpointed to BROADCAST_DB: after a crash the broadcast resumes there,
+# re-sending at most the window that was in flight. Chats that blocked the
+# bot (403) or no longer exist are dropped from the list. Workers sharing
+# BROADCAST_DB take turns: a broadcast is leased to one of them, the lease
+# is renewed at every checkpoint, and another worker takes over (from the
+# cursor) only once it has lapsed.
+BROADCAST_DB = os.getenv("BROADCAST_DB", "broadcast.sqlite3")
+BROADCAST_WINDOW = int(os.getenv("BROADCAST_WINDOW", "100"))
+BROADCAST_LEASE = int(os.getenv("BROADCAST_LEASE", "30"))
+BROADCAST_PAGE = 1000
+BROADCAST_CHECKPOINT_INTERVAL = 1.0
+ADMIN_IDS = frozenset(int(uid) for uid in os.getenv("ADMIN_IDS", "").split(",") if uid.strip())
+
+# Broadcast posts are drawn against one shared Memory key, so subscribers
+# do not get the same post twice within the Memory window
+BROADCAST_UID = channel_uid("@subscribers")
+
+BROADCAST_SENDS = METRICS.register(Counter(
+    "bot_broadcast_sends_total", "Broadcast messages by outcome.", ["result"]
+))
+
+def is_gone(error):
+    # The chat will never accept a message again
+    code = getattr(error, "error_code", None)
+    if code == 403:
+        return True
+    return code == 400 and "chat not found" in str(getattr(error, "description", "")).lower()
+
+
+class Broadcaster:
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS subscribers (
+            chat_id INTEGER PRIMARY KEY,
+            since INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS broadcasts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            origin INTEGER,
+            text TEXT NOT NULL,
+            cursor INTEGER,
+            sent INTEGER NOT NULL DEFAULT 0,
+            blocked INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            done INTEGER NOT NULL DEFAULT 0,
+            owner TEXT,
+            lease_until INTEGER
+        );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.api = None
+        self._conn = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def _connect(self):
+        # The database file only appears once someone subscribes or broadcasts
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(self.SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(broadcasts)")}
+            if "owner" not in columns:
+                # Databases from before leases
+                with self._conn:
+                    self._conn.execute("ALTER TABLE broadcasts ADD COLUMN owner TEXT")
+                    self._conn.execute("ALTER TABLE broadcasts ADD COLUMN lease_until INTEGER")
+        return self._conn
+
+    def _execute(self, sql, params=(), many=False):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                if many:
+                    return conn.executemany(sql, params).fetchall()
+                return conn.execute(sql, params).fetchall()
+
+    def _write(self, sql, params=()):
+        # For statements whose rowcount or lastrowid matter
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                return conn.execute(sql, params)
+
+    def subscribe(self, chat_id):
+        before = self._execute("SELECT 1 FROM subscribers WHERE chat_id = ?", (chat_id,))
+        self._execute("INSERT OR IGNORE INTO subscribers VALUES (?, ?)", (chat_id, int(time.time())))
+        return not before
+
+    def unsubscribe(self, chat_id):
+        before = self._execute("SELECT 1 FROM subscribers WHERE chat_id = ?", (chat_id,))
+        self._execute("DELETE FROM subscribers WHERE chat_id = ?", (chat_id,))
+        return bool(before)
+
+    def count(self):
+        if self._conn is None and not os.path.exists(self.path):
+            return 0
+        return self._execute("SELECT COUNT(*) FROM subscribers")[0][0]
+
+    def create(self, origin, text):
+        broadcast_id = self._write("INSERT INTO broadcasts (origin, text) VALUES (?, ?)", (origin, text)).lastrowid
+        self.start(self.api)
+        self._wakeup.set()
+        return broadcast_id
+
+    # -----------------------------------------------------
+    # Pipeline
+    # -----------------------------------------------------
+
+    def claim(self, owner):
+        # Leases the oldest unfinished broadcast nobody else holds; returns
+        # (broadcast or None, whether any are still unfinished)
+        now = int(time.time())
+        pending = self._execute(
+            "SELECT id, origin, text, cursor, sent, blocked, failed, owner, lease_until FROM broadcasts "
+            "WHERE done = 0 ORDER BY id"
+        )
+        for row in pending:
+            if row[7] not in (None, owner) and row[8] >= now:
+                continue
+            claimed = self._write(
+                "UPDATE broadcasts SET owner = ?, lease_until = ? WHERE id = ? AND done = 0 "
+                "AND (owner IS NULL OR owner = ? OR lease_until < ?)",
+                (owner, now + BROADCAST_LEASE, row[0], owner, now),
+            ).rowcount == 1
+            if claimed:
+                return row[:7], True
+        return None, bool(pending)
+
+    def run(self, broadcast, owner=None):
+        broadcast_id, origin, text, cursor, sent, blocked, failed = broadcast
+        window = threading.Semaphore(BROADCAST_WINDOW)
+        lock = threading.Lock()
+        in_flight = deque()   # submitted chat ids, ascending
+        outcomes = {}         # finished chats still above the cursor
+        gone = []
+        # Counts (and pruning) only cover chats up to the cursor: whatever
+        # finished past it is sent again after a crash, and counted then
+        state = {"cursor": cursor, "sent": sent, "blocked": blocked, "failed": failed}
+
+        def done(job, result, error):
+            if error is None:
+                outcome = "sent"
+            elif is_gone(error):
+                outcome = "blocked"
+            else:
+                outcome = "failed"
+            BROADCAST_SENDS.inc(outcome)
+            with lock:
+                outcomes[job.chat_id] = outcome
+                while in_flight and in_flight[0] in outcomes:
+                    chat_id = in_flight.popleft()
+                    outcome = outcomes.pop(chat_id)
+                    state[outcome] += 1
+                    state["cursor"] = chat_id
+                    if outcome == "blocked":
+                        gone.append(chat_id)
+            window.release()
+
+        def checkpoint(final=False):
+            # None once another worker has taken the broadcast over
+            with lock:
+                snapshot = dict(state)
+                pruned, gone[:] = list(gone), []
+            held = self._write(
+                "UPDATE broadcasts SET cursor = ?, sent = ?, blocked = ?, failed = ?, done = ?, lease_until = ? "
+                "WHERE id = ? AND owner IS ?",
+                (snapshot["cursor"], snapshot["sent"], snapshot["blocked"], snapshot["failed"],
+                 int(final), int(time.time()) + BROADCAST_LEASE, broadcast_id, owner),
+            ).rowcount == 1
+            if not held:
+                logging.warning("Broadcast %d was taken over by another worker", broadcast_id)
+                return None
+            if pruned:
+                self._execute("DELETE FROM subscribers WHERE chat_id = ?", [(c,) for c in pruned], many=True)
+            return snapshot
+
+        api = self.api or bot
+        next_checkpoint = time.monotonic() + BROADCAST_CHECKPOINT_INTERVAL
+        position = cursor
+        while True:
+            if position is None:
+                page = self._execute(
+                    "SELECT chat_id FROM subscribers ORDER BY chat_id LIMIT ?", (BROADCAST_PAGE,)
+                )
+            else:
+                page = self._execute(
+                    "SELECT chat_id FROM subscribers WHERE chat_id > ? ORDER BY chat_id LIMIT ?",
+                    (position, BROADCAST_PAGE),
+                )
+            if not page:
+                break
+            for (chat_id,) in page:
+                while not window.acquire(timeout=BROADCAST_CHECKPOINT_INTERVAL):
+                    if checkpoint() is None:
+                        return
+                with lock:
+                    in_flight.append(chat_id)
+                OUTBOX.submit(api, [send(chat_id, text)], PRIORITY_BULK, done)
+                if time.monotonic() >= next_checkpoint:
+                    if checkpoint() is None:
+                        return
+                    next_checkpoint = time.monotonic() + BROADCAST_CHECKPOINT_INTERVAL
+            position = page[-1][0]
+
+        while True:
+            with lock:
+                if not in_flight:
+                    break
+            time.sleep(BROADCAST_CHECKPOINT_INTERVAL / 10)
+            if time.monotonic() >= next_checkpoint:
+                if checkpoint() is None:
+                    return
+                next_checkpoint = time.monotonic() + BROADCAST_CHECKPOINT_INTERVAL
+        result = checkpoint(final=True)
+        if result is None:
+            return
+        logging.info("Broadcast %d finished: %s", broadcast_id, result)
+        if origin is not None:
+            OUTBOX.submit(api, [send(origin, (
+                f"📣 #{broadcast_id}: {result['sent']} ✅ / {result['blocked']} 🚫 / {result['failed']} ⚠️"
+            ))])
+
+    def _run(self):
+        owner = f"{os.uname().nodename}:{os.getpid()}"
+        while True:
+            broadcast, pending = self.claim(owner)
+            if broadcast is None:
+                # Someone else's lease may lapse; otherwise wait for create()
+                self._wakeup.wait(BROADCAST_LEASE if pending else None)
+                self._wakeup.clear()
+                continue
+            try:
+                self.run(broadcast, owner)
+            except Exception:
+                logging.exception("Broadcast %d failed, retrying shortly", broadcast[0])
+                time.sleep(5)
+
+    def start(self, api):
+        # Without a database there is nothing to resume; create() starts it later
+        self.api = api
+        with self._lock:
+            if self._thread is not None:
+                return
+            if self._conn is None and not os.path.exists(self.path):
+                return
+            self._thread = threading.Thread(target=self._run, name="broadcast", daemon=True)
+            self._thread.start()
+
+BROADCASTS = Broadcaster(BROADCAST_DB)
+
+METRICS.register(Gauge("bot_subscribers", "Chats subscribed to broadcasts.", BROADCASTS.count))
+
+# =========================================================
+# IMAGE CARDS
+# =========================================================
+
+# POST_FORMAT=card sends single sentence posts as an image card, with the
+# text as a copyable caption. Cards are drawn with Pillow (optional, only
+# imported by the render processes) in a process pool, so rendering never
+# runs on a handler or outbox thread. A rendered card is kept in CARD_DIR
+# under a digest of what is drawn on it, and once Telegram has it the
+# returned file_id is kept next to it: every card is uploaded once and
+# resent by id after that. All disk work (and completion callbacks, which
+# the async runtime calls on its loop) runs on one card I/O thread, so
+# CARDS.send is safe to call from anywhere.
+POST_FORMAT = os.getenv("POST_FORMAT", "text")
+CARD_DIR = os.getenv("CARD_DIR", "cards")
+CARD_FONT = os.getenv("CARD_FONT", "DejaVuSans.ttf")
+CARD_SIZE = int(os.getenv("CARD_SIZE", "1080"))
+CARD_WORKERS = int(os.getenv("CARD_WORKERS", "2"))
+# Bump when the drawing changes, so old cards are not reused
+CARD_STYLE = 1
+
+CARDS_SENT = METRICS.register(Counter(
+    "bot_cards_sent_total", "Image cards sent, by where the image came from.", ["source"]
+))
+CARD_RENDER_SECONDS = METRICS.register(Histogram(
+    "bot_card_render_seconds", "Time from card request to rendered file."
+))
+
+# Emoji are not in regular text fonts; the caption still carries them
+_CARD_STRIP_RE = re.compile("[\U0001F000-\U0001FAFF\u2600-\u27BF\uFE0F\u200D]+")
+
+def card_text(text):
+    # Post as rendered for HTML messages -> what goes on the card
+    lines = (_CARD_STRIP_RE.sub("", line).strip() for line in html.unescape(text).split("\n"))
+    return "\n".join(lines).strip()
+
+def card_key(text):
+    style = f"{CARD_STYLE}|{CARD_SIZE}|{CARD_FONT}|{text}"
+    return hashlib.blake2b(style.encode("utf-8"), digest_size=12).hexdigest()
+
+def _wrap(draw, text, font, width):
+    lines = []
+    for paragraph in text.split("\n"):
+        line = ""
+        for word in paragraph.split():
+            candidate = f"{line} {word}" if line else word
+            if line and draw.textlength(candidate, font=font) > width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+def render_card(text, path, font_path, size):
+    # Runs in a card worker process. Right-to-left text is only shaped
+    # correctly when Pillow was built with libraqm.
+    from PIL import Image, ImageDraw, ImageFont
+
+    image = Image.new("RGB", (size, size), (20, 20, 20))
+    draw = ImageDraw.Draw(image)
+
+    # Flag band along the bottom: black, white, green stripes, red triangle
+    band = size // 8
+    top = size - band
+    for i, color in enumerate(((0, 0, 0), (255, 255, 255), (0, 122, 61))):
+        draw.rectangle((0, top + i * band // 3, size, top + (i + 1) * band // 3), fill=color)
+    draw.polygon(((0, top), (band * 2 // 3, top + band // 2), (0, size)), fill=(206, 17, 38))
+
+    margin = size // 12
+    width, height = size - 2 * margin, top - 2 * margin
+    for points in range(size // 14, size // 40, -2):
+        font = ImageFont.truetype(font_path, points)
+        lines = _wrap(draw, text, font, width)
+        spacing = points // 2
+        block = len(lines) * points + (len(lines) - 1) * spacing
+        if block <= height:
+            break
+    y = margin + (height - block) // 2
+    for line in lines:
+        x = (size - draw.textlength(line, font=font)) // 2
+        draw.text((x, y), line, font=font, fill=(245, 245, 245))
+        y += points + spacing
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    image.save(tmp, "PNG", optimize=True)
+    os.replace(tmp, path)
+    return path
+
+
+class CardRenderer:
+
+    def __init__(self, directory, workers):
+        self.directory = directory
+        self.workers = workers
+        self.api = None
+        self.file_ids = {}
+        self._rendering = {}     # key -> requests waiting on that render
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._io = None
+        self._available = None
+
+    def available(self):
+        if self._available is None:
+            import importlib.util
+            self._available = importlib.util.find_spec("PIL") is not None
+            if not self._available:
+                logging.warning("POST_FORMAT=card needs Pillow (pip install Pillow); sending text")
+        return self._available
+
+    def start(self, api):
+        self.api = api
+        if POST_FORMAT == "card":
+            self.available()
+
+    def _later(self, fn, *args):
+        # Runs fn on the card I/O thread
+        with self._pool_lock:
+            if self._io is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._io = ThreadPoolExecutor(1, thread_name_prefix="cards")
+        future = self._io.submit(fn, *args)
+        future.add_done_callback(self._check)
+
+    @staticmethod
+    def _check(future):
+        error = future.exception()
+        if error is not None:
+            logging.error("Card I/O failed", exc_info=error)
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                os.makedirs(self.directory, exist_ok=True)
+                # spawn: forking a process full of threads and locks is not safe
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+                atexit.register(self._pool.shutdown, cancel_futures=True)
+            return self._pool
+
+    def _drop_pool(self, pool):
+        # A worker died (OOM kill, crash in Pillow): the pool is unusable,
+        # the next render starts a fresh one
+        with self._pool_lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+        logging.warning("Card render pool broke, starting a new one")
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".png")
+
+    def file_id(self, key):
+        file_id = self.file_ids.get(key)
+        if file_id is None:
+            try:
+                with open(os.path.join(self.directory, key + ".id"), encoding="utf-8") as f:
+                    file_id = self.file_ids[key] = f.read().strip() or None
+            except OSError:
+                return None
+        return file_id
+
+    def remember(self, key, file_id):
+        self.file_ids[key] = file_id
+        path = os.path.join(self.directory, key + ".id")
+        try:
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(file_id)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            logging.exception("Could not store file_id of card %s", key)
+
+    def forget(self, key):
+        self.file_ids.pop(key, None)
+        try:
+            os.remove(os.path.join(self.directory, key + ".id"))
+        except OSError:
+            pass
+
+    def send(self, chat_id, text, reply_markup=None):
+        # Queues the card for `chat_id` and returns at once; the photo goes
+        # through the outbox when it is ready.
+        caption = f"<code>{text}</code>"
+        self._later(self._send, (chat_id, caption, reply_markup), text)
+
+    def _send(self, request, text):
+        key = card_key(card_text(text))
+        if self.file_id(key) is not None:
+            self._send_by_id(key, request)
+            return
+        if os.path.exists(self._path(key)):
+            self._upload(key, request, "disk")
+            return
+        with self._lock:
+            waiting = self._rendering.get(key)
+            if waiting is not None:
+                # Same card already on its way: ride along instead of redrawing
+                waiting.append(request)
+                return
+            self._rendering[key] = [request]
+        started = time.perf_counter()
+        pool = self._executor()
+        try:
+            future = pool.submit(render_card, card_text(text), self._path(key), CARD_FONT, CARD_SIZE)
+        except Exception as e:
+            self._failed(key, pool, e)
+            return
+        future.add_done_callback(lambda f: self._rendered(key, pool, f, started))
+
+    def _failed(self, key, pool, error):
+        from concurrent.futures.process import BrokenProcessPool
+        if isinstance(error, BrokenProcessPool):
+            self._drop_pool(pool)
+        with self._lock:
+            waiting = self._rendering.pop(key, [])
+        logging.error("Rendering card %s failed, sending text: %r", key, error)
+        for request in waiting:
+            self._as_text(request)
+
+    def _as_text(self, request):
+        chat_id, caption, reply_markup = request
+        OUTBOX.submit(self.api or bot, [send(chat_id, caption, reply_markup)])
+
+    def _send_failed(self, key, request, error):
+        # The post is already in Memory and the callback answered: the
+        # user gets it as text rather than not at all
+        chat_id = request[0]
+        if is_gone(error):
+            logging.warning("Card %s not sent to %s: %s", key, chat_id, error)
+            return
+        logging.error("Sending card %s to %s failed, sending text: %s", key, chat_id, error)
+        self._as_text(request)
+
+    def _rendered(self, key, pool, future, started):
+        error = RuntimeError("render cancelled") if future.cancelled() else future.exception()
+        if error is not None:
+            self._failed(key, pool, error)
+            return
+        with self._lock:
+            waiting = self._rendering.pop(key)
+        CARD_RENDER_SECONDS.observe(time.perf_counter() - started)
+        # The first upload yields the file_id the others can reuse
+        self._later(self._upload, key, waiting[0], "render", waiting[1:])
+
+    def _upload(self, key, request, source, followers=()):
+        chat_id, caption, reply_markup = request
+        try:
+            with open(self._path(key), "rb") as f:
+                photo = f.read()
+        except OSError as e:
+            for waiting in (request,) + tuple(followers):
+                self._send_failed(key, waiting, e)
+            return
+
+        def uploaded(result, error):
+            if error is None:
+                self.remember(key, result.photo[-1].file_id)
+            else:
+                self._send_failed(key, request, error)
+            for follower in followers:
+                if error is None:
+                    self._send_by_id(key, follower)
+                else:
+                    self._upload(key, follower, source)
+
+        def done(job, result, error):
+            self._later(uploaded, result, error)
+
+        reply = Reply("send_photo", {
+            "chat_id": chat_id, "photo": photo, "caption": caption, "reply_markup": reply_markup,
+        })
+        OUTBOX.submit(self.api or bot, [reply], done=done)
+        CARDS_SENT.inc(source)
+
+    def _send_by_id(self, key, request):
+        chat_id, caption, reply_markup = request
+
+        def sent(error):
+            # An id from another bot token (or an expired one): upload again
+            if getattr(error, "error_code", None) == 400:
+                self.forget(key)
+                self._upload(key, request, "disk")
+            elif error is not None:
+                self._send_failed(key, request, error)
+
+        def done(job, result, error):
+            if error is not None:
+                self._later(sent, error)
+
+        reply = Reply("send_photo", {
+            "chat_id": chat_id, "photo": self.file_id(key), "caption": caption, "reply_markup": reply_markup,
+        })
+        OUTBOX.submit(self.api or bot, [reply], done=done)
+        CARDS_SENT.inc("file_id")
+
+CARDS = CardRenderer(CARD_DIR, CARD_WORKERS)
+
+# Background work that posts on its own needs the runtime's API object
+def start_services(api):
+    setup_scheduler(api)
+    BROADCASTS.start(api)
+    CARDS.start(api)
+    PARAPHRASES.start()
 
 # =========================================================
 # RUN
 # =========================================================
 
-logging.info("Professional Palestine Content Bot Running...")
-bot.infinity_polling(skip_pending=True)
+# "sync": TeleBot + worker threads, "async": AsyncTeleBot on one event loop,
+# "webhook": embedded HTTP server fed by Telegram instead of long polling
+BOT_MODE = os.getenv("BOT_MODE", "sync")
 
+def run_sync():
+    start_services(bot)
+    bot.infinity_polling(skip_pending=True)
 
+def run_async():
+    import asyncio
+    from telebot.async_telebot import AsyncTeleBot
+
+    async_bot = AsyncTeleBot(TOKEN, parse_mode="HTML")
+
+    # Nothing that can block may run on the loop: SQLite (subscribers, and
+    # Memory cache misses with the sqlite backend) goes to the default
+    # executor, and the content index is compiled before polling starts.
+    memory_blocks = MEMORY_BACKEND == "sqlite"
+
+    async def build(branch, builder, update, blocking=False):
+        if blocking or memory_blocks:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, observe_handler, branch, builder, update)
+        return observe_handler(branch, builder, update)
+
+    async def start_async(msg):
+        OUTBOX.submit(async_bot, await build("start", start_replies, msg))
+
+    async def batch_async(msg):
+        OUTBOX.submit(async_bot, await build("batch_command", batch_replies, msg))
+
+    async def callbacks_async(call):
+        OUTBOX.submit(async_bot, await build(callback_branch(call), callback_replies, call))
+
+    async def subscribe_async(msg):
+        OUTBOX.submit(async_bot, await build("subscribe", subscribe_replies, msg, blocking=True))
+
+    async def unsubscribe_async(msg):
+        OUTBOX.submit(async_bot, await build("unsubscribe", unsubscribe_replies, msg, blocking=True))
+
+    async def broadcast_async(msg):
+        OUTBOX.submit(async_bot, await build("broadcast", broadcast_replies, msg, blocking=True))
+
+    async def inline_async(query):
+        OUTBOX.submit(async_bot, await build("inline", inline_replies, query))
+
+    async def chosen_inline_async(chosen):
+        await build("chosen_inline", chosen_replies, chosen)
+
+    def warm_index():
+        for category in CATEGORIES:
+            INDEX[category]
+
+    async def main():
+        outbox = asyncio.ensure_future(OUTBOX.run_async())
+        await asyncio.sleep(0)  # the outbox driver installs itself before anything submits
+        start_services(async_bot)
+        await asyncio.get_running_loop().run_in_executor(None, warm_index)
+        try:
+            await async_bot.infinity_polling(skip_pending=True)
+        finally:
+            outbox.cancel()
+
+    async_bot.register_message_handler(start_async, commands=["start"])
+    async_bot.register_message_handler(batch_async, commands=["batch"])
+    async_bot.register_callback_query_handler(callbacks_async, func=lambda c: True)
+    async_bot.register_message_handler(subscribe_async, commands=["subscribe"])
+    async_bot.register_message_handler(unsubscribe_async, commands=["unsubscribe"])
+    async_bot.register_message_handler(broadcast_async, commands=["broadcast"])
+    async_bot.register_inline_handler(inline_async, func=lambda q: True)
+    async_bot.register_chosen_inline_handler(chosen_inline_async, func=lambda r: True)
+    asyncio.run(main())
+
+def run_webhook():
+    # Handlers run on the webhook workers, not on TeleBot's own thread pool,
+    # so the bounded update queue is the only buffer in front of them.
+    bot.threaded = False
+    if WEBHOOK_URL:
+        bot.remove_webhook()
+        bot.set_webhook(WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH, secret_token=WEBHOOK_SECRET)
+    server = WebhookServer(
+        bot, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH,
+        secret=WEBHOOK_SECRET, workers=WEBHOOK_WORKERS, queue_size=WEBHOOK_QUEUE,
+    )
+    start_services(bot)
+    server.serve_forever()
 
+RUNNERS = {"sync": run_sync, "async": run_async, "webhook": run_webhook}
 
+if __name__ == "__main__":
+    if BOT_MODE not in RUNNERS:
+        raise SystemExit(f"Unknown BOT_MODE {BOT_MODE!r}, expected one of: {', '.join(RUNNERS)}")
+    setup_memory_backend()
+    if METRICS_PORT:
+        MetricsServer(METRICS_HOST, METRICS_PORT).start()
+    if CONTENT_RELOAD_INTERVAL > 0:
+        INDEX.start_watcher(CONTENT_RELOAD_INTERVAL)
+    logging.info("Professional Palestine Content Bot Running (%s mode)...", BOT_MODE)
+    RUNNERS[BOT_MODE]()
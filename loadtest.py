@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+
+# Offline load test: a stand-in Bot API server plus a traffic generator.
+# The bot runs in-process against the fake server, so nothing reaches
+# Telegram. Run with e.g.:
+#   python loadtest.py --mode sync --users 2000 --updates 20000
+#   python loadtest.py --mode webhook --rate 500
+# The outbox limits default to "unlimited" so the numbers measure the bot
+# itself; pass --global-rate 30 --chat-rate 1 to see Telegram's limits.
+# --paraphrase also starts a stand-in OpenAI-compatible chat completions
+# server and turns the paraphrase tier on against it.
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import threading
+import http.client
+from collections import deque
+from urllib.parse import parse_qsl, urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("BOT_TOKEN", "0:loadtest")
+os.environ.setdefault("CONTENT_RELOAD_INTERVAL", "0")
+
+import telebot
+import telebot.asyncio_helper
+import bot
+
+# =========================================================
+# FAKE BOT API
+# =========================================================
+
+class FakeTelegram:
+    # Serves getUpdates from a local queue and acknowledges everything the
+    # bot sends, recording when each callback query got its answer.
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.updates = deque()
+        self.cond = threading.Condition()
+        self.sent_at = {}        # callback query id -> time the update was handed out
+        self.latencies = []      # update handed out -> answerCallbackQuery received
+        self.calls = {}
+        self.message_id = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def push(self, update):
+        with self.cond:
+            self.updates.append(update)
+            self.cond.notify_all()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                self.do_POST()
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                method = url.path.rsplit("/", 1)[-1]
+                params = dict(parse_qsl(url.query))
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                if self.headers.get("Content-Type", "").startswith("application/x-www-form-urlencoded"):
+                    params.update(parse_qsl(body.decode("utf-8")))
+                result = server.call(method, params)
+                payload = json.dumps({"ok": True, "result": result}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        return Handler
+
+    def call(self, method, params):
+        now = time.perf_counter()
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        if method == "getUpdates":
+            return self.get_updates(int(params.get("offset", 0)), float(params.get("timeout", 0)))
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Load", "username": "loadtest_bot"}
+        if method == "answerCallbackQuery":
+            started = self.sent_at.pop(params.get("callback_query_id"), None)
+            if started is not None:
+                with self.lock:
+                    self.latencies.append(now - started)
+            return True
+        if method in ("sendMessage", "editMessageText", "sendDocument"):
+            with self.lock:
+                self.message_id += 1
+                message_id = self.message_id
+            chat_id = int(params.get("chat_id", 0))
+            return {
+                "message_id": message_id, "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"}, "text": params.get("text", ""),
+            }
+        return True
+
+    def get_updates(self, offset, timeout):
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            # Telegram semantics: offset confirms everything before it
+            while self.updates and self.updates[0]["update_id"] < offset:
+                self.updates.popleft()
+            while not self.updates and time.monotonic() < deadline:
+                self.cond.wait(deadline - time.monotonic())
+            batch = list(self.updates)[:100]
+        handed_out = time.perf_counter()
+        for update in batch:
+            self.delivered(update, handed_out)
+        return batch
+
+    def delivered(self, update, at):
+        query = update.get("callback_query")
+        if query is not None:
+            self.sent_at.setdefault(query["id"], at)
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name="fake-telegram", daemon=True).start()
+
+class FakeOpenAI:
+    # /v1/chat/completions that "paraphrases" the JSON array it is sent by
+    # tagging each sentence with a running number, after `latency` seconds.
+
+    def __init__(self, latency=0.2, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length))
+                payload = json.dumps(server.complete(request)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        return Handler
+
+    def complete(self, request):
+        time.sleep(self.latency)
+        with self.lock:
+            self.requests += 1
+            n = self.requests
+        sentences = json.loads(request["messages"][-1]["content"])
+        variants = [f"{sentence} ({n}.{i})" for i, sentence in enumerate(sentences)]
+        return {
+            "id": f"chatcmpl-{n}", "object": "chat.completion", "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0, "finish_reason": "stop",
+                "message": {"role": "assistant", "content": json.dumps(variants, ensure_ascii=False)},
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name="fake-openai", daemon=True).start()
+
+# =========================================================
+# TRAFFIC
+# =========================================================
+
+def callback_flows(category):
+    return [
+        "main|sentences", "main|hashtags",
+        f"sentences|{category}", f"hashtags|{category}",
+        f"regen|sentences|{category}", f"regen|hashtags|{category}",
+        "back_main",
+    ]
+
+def make_update(update_id, uid, data):
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": {"id": uid, "is_bot": False, "first_name": f"user{uid}"},
+            "chat_instance": str(uid),
+            "data": data,
+            "message": {
+                "message_id": 1, "date": int(time.time()),
+                "chat": {"id": uid, "type": "private"},
+            },
+        },
+    }
+
+class WebhookClient:
+    # Posts updates to the bot's webhook like Telegram would, over one
+    # keep-alive connection per sender thread.
+
+    def __init__(self, fake, address, path, senders=8):
+        self.fake = fake
+        self.address = address
+        self.path = path
+        self.pending = deque()
+        self.cond = threading.Condition()
+        self.rejected = 0
+        for i in range(senders):
+            threading.Thread(target=self._work, name=f"webhook-sender-{i}", daemon=True).start()
+
+    def push(self, update):
+        with self.cond:
+            self.pending.append(update)
+            self.cond.notify()
+
+    def _work(self):
+        conn = http.client.HTTPConnection(*self.address)
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+                update = self.pending.popleft()
+            body = json.dumps(update).encode("utf-8")
+            self.fake.delivered(update, time.perf_counter())
+            conn.request("POST", self.path, body, {"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                # Telegram would redeliver; count it and retry after a pause
+                self.rejected += 1
+                time.sleep(0.01)
+                self.push(update)
+
+def generate(target, users, updates, rate, seed=1):
+    rng = random.Random(seed)
+    interval = 1.0 / rate if rate else 0
+    started = time.perf_counter()
+    for n in range(1, updates + 1):
+        uid = 100000 + rng.randrange(users)
+        data = rng.choice(callback_flows(rng.choice(bot.CATEGORIES)))
+        target.push(make_update(n, uid, data))
+        if interval:
+            delay = started + n * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+# =========================================================
+# RUN
+# =========================================================
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def time_handlers():
+    # Wraps the bot's handler hook so every reply build is timed individually;
+    # the metrics histogram alone only gives bucketed counts
+    durations = []
+    observe = bot.observe_handler
+
+    def timed(branch, build, update):
+        started = time.perf_counter()
+        try:
+            return observe(branch, build, update)
+        finally:
+            durations.append(time.perf_counter() - started)
+
+    bot.observe_handler = timed
+    return durations
+
+def start_bot(mode, fake):
+    # Returns whatever the traffic generator should push updates into
+    telebot.apihelper.API_URL = fake.url + "/bot{0}/{1}"
+    if mode == "async":
+        telebot.asyncio_helper.API_URL = fake.url + "/bot{0}/{1}"
+        threading.Thread(target=bot.run_async, name="bot-async", daemon=True).start()
+        return fake
+    if mode == "webhook":
+        bot.bot.threaded = False
+        server = bot.WebhookServer(
+            bot.bot, "127.0.0.1", 0, bot.WEBHOOK_PATH,
+            workers=bot.WEBHOOK_WORKERS, queue_size=bot.WEBHOOK_QUEUE,
+        )
+        bot.start_services(bot.bot)
+        threading.Thread(target=server.serve_forever, name="bot-webhook", daemon=True).start()
+        return WebhookClient(fake, server.httpd.server_address[:2], bot.WEBHOOK_PATH)
+    threading.Thread(target=bot.run_sync, name="bot-sync", daemon=True).start()
+    return fake
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test against a fake Bot API.")
+    parser.add_argument("--mode", choices=sorted(bot.RUNNERS), default="sync")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--updates", type=int, default=10000)
+    parser.add_argument("--rate", type=float, default=0, help="updates/s, 0 = as fast as possible")
+    parser.add_argument("--global-rate", type=float, default=1e9, help="outbox calls/s overall")
+    parser.add_argument("--chat-rate", type=float, default=1e9, help="outbox calls/s per chat")
+    parser.add_argument("--paraphrase", action="store_true", help="serve paraphrases from a stub model")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="stub model seconds per request")
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    llm = None
+    if args.paraphrase:
+        llm = FakeOpenAI(args.llm_latency)
+        llm.start()
+        os.environ["OPENAI_BASE_URL"] = llm.url
+        bot.PARAPHRASE_MODE = "on"
+
+    bot.OUTBOX.global_bucket = bot.TokenBucket(args.global_rate, bot.OUTBOX_GLOBAL_BURST)
+    bot.OUTBOX.chat_rate = args.chat_rate
+    fake = FakeTelegram()
+    fake.start()
+    handler_times = time_handlers()
+    target = start_bot(args.mode, fake)
+
+    memory_before = bot.Memory.size()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    generate(target, args.users, args.updates, args.rate)
+
+    deadline = started + args.timeout
+    while len(fake.latencies) < args.updates and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    # Let the lower-priority edits and sends behind the answers go out too
+    while (bot.OUTBOX._ready or bot.OUTBOX._parked) and time.perf_counter() < deadline:
+        time.sleep(0.05)
+
+    done = len(fake.latencies)
+    handler = bot.HANDLER_SECONDS
+    print(f"mode              {args.mode}")
+    print(f"virtual users     {args.users}")
+    print(f"updates answered  {done}/{args.updates} in {elapsed:.2f} s")
+    print(f"throughput        {done / elapsed:.0f} updates/s")
+    print(f"answer latency    p50 {percentile(fake.latencies, 0.50) * 1000:.1f} ms"
+          f"  p99 {percentile(fake.latencies, 0.99) * 1000:.1f} ms")
+    with handler._lock:
+        spent = sum(series[1] for series in handler.series.values())
+        count = sum(series[2] for series in handler.series.values())
+    print(f"handler time      p50 {percentile(handler_times, 0.50) * 1e6:.0f} us"
+          f"  p99 {percentile(handler_times, 0.99) * 1e6:.0f} us"
+          f"  mean {spent / max(count, 1) * 1e6:.0f} us")
+    print(f"memory entries    {memory_before} -> {bot.Memory.size()}")
+    print(f"max rss           {rss_before} -> {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss} KiB")
+    print(f"api calls         {dict(sorted(fake.calls.items()))}")
+    if llm is not None:
+        served = {labels[0]: value for labels, value in bot.PARAPHRASE_SERVED.values.items()}
+        print(f"paraphrases       {llm.requests} model requests, served {served}")
+    if isinstance(target, WebhookClient):
+        print(f"webhook 503s      {target.rejected}")
+    return 0 if done == args.updates else 1
+
+if __name__ == "__main__":
+    sys.exit(main())